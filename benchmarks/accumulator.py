@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# accumulator.py
+
+"""
+    This script compares util.Accumulator with the former merging of attributes (util.combine_dict_in_list),
+    when the values of a flattened object are merged one by one (see SuperICPObj.repack).
+
+    Example usage:
+
+    python benchmarks/accumulator.py
+    python benchmarks/accumulator.py --values 1000 10000 50000 --attributes 500
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import argparse
+import timeit
+import tracemalloc
+
+# import from other lib
+# import from my project
+from icp2edd.util import Accumulator, combine_dict_in_list
+
+
+# ----------------------------------------------
+def mergeCombine(values_):
+    """former merge, new dictionary, and lists, at each value"""
+    flat = {}
+    for d in values_:
+        flat = combine_dict_in_list(d, flat)
+    return flat
+
+
+def mergeAccumulator(values_):
+    """merge in place, in the same order (values prepended)"""
+    flat = Accumulator(prepend=True)
+    for d in values_:
+        flat.merge(d)
+    return flat
+
+
+def objectValues(n_, attributes_):
+    """create n_ values, spread over attributes_ attributes, as merged one by one"""
+    return [{f"attribute{i % attributes_}": [f"value{i}"]} for i in range(n_)]
+
+
+def peak(func_, values_):
+    """return peak memory allocated by func_, in MB"""
+    tracemalloc.start()
+    func_(values_)
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--values", type=int, nargs="+", default=[1000, 5000, 20000], help="number of values"
+    )
+    parser.add_argument("--attributes", type=int, default=500, help="number of attributes")
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetition")
+    args = parser.parse_args()
+
+    print(
+        f"{'values':>8} {'old (s)':>10} {'new (s)':>10} {'speedup':>8} {'old (MB)':>9} {'new (MB)':>9}"
+    )
+    for n in args.values:
+        values = objectValues(n, args.attributes)
+
+        # check both give the same attributes, and values in the same order
+        old, new = mergeCombine(values), mergeAccumulator(values)
+        assert old == dict(new), "merge differs"
+
+        told = min(timeit.repeat(lambda: mergeCombine(values), number=1, repeat=args.repeat))
+        tnew = min(timeit.repeat(lambda: mergeAccumulator(values), number=1, repeat=args.repeat))
+        mold, mnew = peak(mergeCombine, values), peak(mergeAccumulator, values)
+        print(
+            f"{n:>8} {told:>10.4f} {tnew:>10.4f} {told / tnew:>8.1f} {mold:>9.2f} {mnew:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# groupby.py
+
+"""
+    This script compares ICPObj._groupby with the former list-based grouping,
+    on synthetic SPARQL outputs, with growing number of values by attribute.
+
+    Example usage:
+
+    python benchmarks/groupby.py
+    python benchmarks/groupby.py --uris 10 --values 5 10 20 40
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import argparse
+import copy
+import timeit
+
+# import from other lib
+from SPARQLWrapper.SmartWrapper import Bindings
+
+# import from my project
+import icp2edd.setupcfg as setupcfg
+from icp2edd.icpobj.icpObj import ICPObj, _objtype_suffix
+from icp2edd.sparqlClient import _JSONResult
+
+
+# ----------------------------------------------
+def groupbyList(res):
+    """former grouping, deduplicate values with 'in' on list"""
+    dict1 = {}
+    for binding in res.bindings:
+        uri = binding["uri"].value
+        if uri not in dict1:
+            dict1[uri] = {}
+        dict2 = dict1[uri]
+
+        binding.pop("type", None)
+        for k, v in binding.items():
+            if k.endswith(_objtype_suffix):
+                continue
+            if k not in dict2.keys():
+                dict2[k] = []
+            if v.type == "uri" and "meta.icos-cp.eu" not in v.value:
+                v.type = "literal"
+            if v not in dict2[k]:
+                dict2[k] += [v]
+    return dict1
+
+
+def sparqlOutput(nuri_, nval_):
+    """create SPARQL JSON output, as returned by 'optional' strategy:
+    cartesian product of three multi-valued attributes, for each uri
+    """
+    rows = []
+    for i in range(nuri_):
+        uri = {"type": "uri", "value": f"https://meta.icos-cp.eu/objects/obj{i}"}
+        for a in range(nval_):
+            for b in range(nval_):
+                for c in range(3):
+                    rows.append(
+                        {
+                            "uri": uri,
+                            "keyword": {"type": "literal", "value": f"keyword{a}"},
+                            "variable": {"type": "literal", "value": f"variable{b}"},
+                            "size": {
+                                "type": "literal",
+                                "value": f"{c}",
+                                "datatype": "http://www.w3.org/2001/XMLSchema#long",
+                            },
+                        }
+                    )
+    return {"head": {"vars": ["uri", "keyword", "variable", "size"]}, "results": {"bindings": rows}}
+
+
+def flatten(meta_):
+    """comparable version of grouped metadata"""
+    return {
+        uri: {k: [(v.type, v.value, v.datatype, v.lang) for v in lv] for k, lv in dict2.items()}
+        for uri, dict2 in meta_.items()
+    }
+
+
+def timed(func_, json_, repeat_):
+    """return best time of func_ on a fresh copy of SPARQL output json_, over repeat_ repetitions"""
+    return min(
+        timeit.repeat(
+            "func_(res)",
+            setup="res = Bindings(_JSONResult(copy.deepcopy(json_)))",
+            number=1,
+            repeat=repeat_,
+            globals={**globals(), "func_": func_, "json_": json_},
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--uris", type=int, default=5, help="number of uri")
+    parser.add_argument(
+        "--values", type=int, nargs="+", default=[5, 10, 20, 40], help="number of values by attribute"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetition")
+    args = parser.parse_args()
+
+    setupcfg.allowed_objects = []
+    obj = ICPObj()
+
+    print(f"{'values':>8} {'rows':>8} {'list (s)':>10} {'set (s)':>10} {'speedup':>8}")
+    for nval in args.values:
+        json_ = sparqlOutput(args.uris, nval)
+
+        # check both give the same output
+        old = groupbyList(Bindings(_JSONResult(copy.deepcopy(json_))))
+        new = obj._groupby(Bindings(_JSONResult(copy.deepcopy(json_))))
+        assert flatten(old) == flatten(new), "grouping differs"
+
+        # grouping mutates bindings (pop 'type'): fresh SPARQL output built for each repetition,
+        # only grouping is timed
+        told = timed(groupbyList, json_, args.repeat)
+        tnew = timed(obj._groupby, json_, args.repeat)
+        nrows = len(json_["results"]["bindings"])
+        print(f"{nval:>8} {nrows:>8} {told:>10.4f} {tnew:>10.4f} {told / tnew:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
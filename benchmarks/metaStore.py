@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# metaStore.py
+
+"""
+    This script compares MetaStore.merge with the former dictionary re-copying merge
+    (meta = {**new, **meta}), when metadata of the graph nodes are merged one by one.
+
+    Example usage:
+
+    python benchmarks/metaStore.py
+    python benchmarks/metaStore.py --nodes 100 1000 10000 50000 --copy-max 20000
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import argparse
+import timeit
+
+# import from other lib
+# import from my project
+from icp2edd.metaStore import MetaStore
+from icp2edd.rdfTerm import Term
+
+
+# ----------------------------------------------
+def mergeCopy(fetched_):
+    """former merge, copy the whole dictionary at each node"""
+    meta = {}
+    for _ in fetched_:
+        meta = {**_, **meta}
+    return meta
+
+
+def mergeStore(fetched_):
+    """merge in place"""
+    meta = MetaStore()
+    for _ in fetched_:
+        meta.merge(_)
+    return meta
+
+
+def graphNodes(n_):
+    """create metadata of n_ nodes, as fetched one by one (each node fetched twice)"""
+    fetched = []
+    for i in range(n_):
+        uri = f"https://meta.icos-cp.eu/objects/obj{i}"
+        binding = {
+            "uri": [Term("uri", uri)],
+            "label": [Term("literal", f"label{i}")],
+            "link": [Term("uri", f"https://meta.icos-cp.eu/objects/obj{(i + 1) % n_}")],
+        }
+        fetched.append({uri: binding})
+    # uri already merged are fetched again, first writer should win
+    return fetched + [{uri: {}} for _ in fetched[::2] for uri in _]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000, 10000, 50000],
+        help="number of graph nodes",
+    )
+    parser.add_argument(
+        "--copy-max", type=int, default=20000, help="do not time former merge above this number of nodes"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetition")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'copy (s)':>10} {'store (s)':>10} {'speedup':>8}")
+    for n in args.nodes:
+        fetched = graphNodes(n)
+
+        tnew = min(timeit.repeat(lambda: mergeStore(fetched), number=1, repeat=args.repeat))
+        if n > args.copy_max:
+            print(f"{n:>8} {'-':>10} {tnew:>10.4f} {'-':>8}")
+            continue
+
+        # check both give the same output
+        assert dict(mergeStore(fetched)) == mergeCopy(fetched), "merge differs"
+
+        told = min(timeit.repeat(lambda: mergeCopy(fetched), number=1, repeat=args.repeat))
+        print(f"{n:>8} {told:>10.4f} {tnew:>10.4f} {told / tnew:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
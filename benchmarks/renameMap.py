@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# renameMap.py
+
+"""
+    This script compares RenameMap with the former renaming of attributes (SuperICPObj._renameKeyDic),
+    when flattening a synthetic DataObject: every value is renamed on its own,
+    and every linked object's attributes are renamed once prefixed.
+
+    Example usage:
+
+    python benchmarks/renameMap.py
+    python benchmarks/renameMap.py --attributes 5000 --values 3 --rules 2 20 100
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import argparse
+import timeit
+
+# import from other lib
+# import from my project
+from icp2edd.renameMap import RenameMap
+
+
+# ----------------------------------------------
+def renameKeyDic(convert_, dict_):
+    """former renaming, rebuild the whole dictionary once per rule"""
+    for oldKey, newKey in convert_.items():
+        dict_ = dict((newKey, v) if k == oldKey else (k, v) for k, v in dict_.items())
+    return dict_
+
+
+def flattenOld(convert_, attributes_, values_):
+    """rename each value, then prefixed attributes, with former renaming"""
+    out = []
+    for k in attributes_:
+        for v in range(values_):
+            out.append(renameKeyDic(convert_, {k: [v]}))
+    out.append(renameKeyDic(convert_, {"specification_" + k: [0] for k in attributes_}))
+    return out
+
+
+def flattenNew(convert_, attributes_, values_):
+    """rename each value, then prefixed attributes, with RenameMap"""
+    rename = RenameMap(convert_)
+    out = []
+    for k in attributes_:
+        for v in range(values_):
+            out.append({rename(k): [v]})
+    out.append({rename("specification_" + k): [0] for k in attributes_})
+    return out
+
+
+def dataObject(n_):
+    """create attribute names of a synthetic DataObject with n_ attributes"""
+    attributes = [f"attribute{i}" for i in range(n_ - 2)]
+    return attributes + ["type_units", "license_exact_match"]
+
+
+def rules(n_):
+    """create n_ convert rules, with those of the default parameters file"""
+    convert = {"type_units": "units", "license_exact_match": "license"}
+    for i in range(n_ - len(convert)):
+        convert[f"attribute{i * 7}"] = f"renamed{i}"
+    return convert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--attributes", type=int, default=5000, help="number of attributes")
+    parser.add_argument("--values", type=int, default=3, help="number of values by attribute")
+    parser.add_argument(
+        "--rules", type=int, nargs="+", default=[2, 20, 100], help="number of convert rules"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetition")
+    args = parser.parse_args()
+
+    attributes = dataObject(args.attributes)
+    print(f"{'rules':>8} {'old (s)':>10} {'new (s)':>10} {'speedup':>8}")
+    for n in args.rules:
+        convert = rules(n)
+
+        # check both give the same output
+        assert flattenOld(convert, attributes, args.values) == flattenNew(
+            convert, attributes, args.values
+        ), "renaming differs"
+
+        told = min(
+            timeit.repeat(
+                lambda: flattenOld(convert, attributes, args.values), number=1, repeat=args.repeat
+            )
+        )
+        tnew = min(
+            timeit.repeat(
+                lambda: flattenNew(convert, attributes, args.values), number=1, repeat=args.repeat
+            )
+        )
+        print(f"{n:>8} {told:>10.4f} {tnew:>10.4f} {told / tnew:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
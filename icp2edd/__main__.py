@@ -50,19 +50,29 @@ def main():
         _logger.exception("Something goes wrong when setting up DataObject")
         raise  # Throw exception again so calling code knows it happened
 
-    _logger.info("read DataObject from ICOS-CP:")
-    try:
-        dataobjs.getMeta()
-    except Exception:
-        _logger.exception("Something goes wrong when loading DataObj metadata")
-        raise  # Throw exception again so calling code knows it happened
+    if setupcfg.sparqlPageSize:
+        _logger.info("read DataObject from ICOS-CP page by page, and download it")
+        try:
+            dd = dataobjs.download(dataobjs.iterMeta(setupcfg.sparqlPageSize))
+        except Exception:
+            _logger.exception(
+                "Something goes wrong when loading DataObj metadata, or downloading DataObject data"
+            )
+            raise  # Throw exception again so calling code knows it happened
+    else:
+        _logger.info("read DataObject from ICOS-CP:")
+        try:
+            dataobjs.getMeta()
+        except Exception:
+            _logger.exception("Something goes wrong when loading DataObj metadata")
+            raise  # Throw exception again so calling code knows it happened
 
-    _logger.info("download DataObject from ICOS-CP")
-    try:
-        dd = dataobjs.download()
-    except Exception:
-        _logger.exception("Something goes wrong when downloading DataObject data")
-        raise  # Throw exception again so calling code knows it happened
+        _logger.info("download DataObject from ICOS-CP")
+        try:
+            dd = dataobjs.download()
+        except Exception:
+            _logger.exception("Something goes wrong when downloading DataObject data")
+            raise  # Throw exception again so calling code knows it happened
 
     # loop on each dataset downloaded
     for csv, rep in dd.items():
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# fixture.py
+
+"""
+    This module set up a record/replay of ICOS CP responses, so that runs could be timed
+    reproducibly, offline, and compared commit to commit.
+
+    In 'record' mode, every SPARQL response, and every file downloaded by DataObject.download,
+    is stored in a fixture directory.
+    In 'replay' mode, they are read back from this directory, instead of ICOS CP,
+    optionally after an artificial latency (to mimic the network).
+
+    Fixtures are keyed by a hash of the normalised query text (see sparqlCache.normalise),
+    or of the file url:
+    <directory>/sparql/<hash>.json.gz
+    <directory>/download/<hash>
+
+    Example usage:
+
+    import icp2edd.fixture as fixture
+
+    fix = fixture.getFixture()          # None, if record/replay is not set up
+    if fix is not None and fix.replay:
+        json_ = fix.loadQuery(query)    # read SPARQL response
+    fix.saveQuery(query, json_)         # store SPARQL response (record mode)
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# import from other lib
+# import from my project
+import icp2edd.setupcfg as setupcfg
+from icp2edd.sparqlCache import normalise
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# record/replay modes
+modes = ("record", "replay")
+
+# shared fixture
+_fixture = None
+_lock = threading.Lock()
+
+
+# ----------------------------------------------
+def _hash(str_):
+    """return hash of string"""
+    return hashlib.sha1(str_.encode()).hexdigest()
+
+
+class Fixture(object):
+    """ """
+
+    def __init__(self, path_, mode_, latency=None):
+        """initialise record/replay fixture
+
+        :param path_: fixture directory
+        :param mode_: 'record' or 'replay'
+        :param latency: artificial latency added to each replayed response, in seconds [default 0]
+        """
+        if mode_ not in modes:
+            raise ValueError(f"invalid fixture mode {mode_}, must be one of {modes}")
+
+        self.path = Path(path_)
+        self.mode = mode_
+        self.latency = float(latency or 0)
+
+        if self.record:
+            (self.path / "sparql").mkdir(parents=True, exist_ok=True)
+            (self.path / "download").mkdir(parents=True, exist_ok=True)
+        elif not self.path.is_dir():
+            raise FileNotFoundError(f"can not find fixture directory {self.path}")
+
+    @property
+    def record(self):
+        """True in record mode"""
+        return self.mode == "record"
+
+    @property
+    def replay(self):
+        """True in replay mode"""
+        return self.mode == "replay"
+
+    def _queryFile(self, query_):
+        """return fixture file of SPARQL query"""
+        return self.path / "sparql" / f"{_hash(normalise(query_))}.json.gz"
+
+    def _downloadFile(self, url_):
+        """return fixture file of downloaded url"""
+        return self.path / "download" / _hash(str(url_))
+
+    def _wait(self):
+        """sleep artificial latency"""
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _write(file_, data_):
+        """write data in file, through a temporary file, so that fixture is never half written"""
+        tmp = file_.with_name(f"{file_.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data_)
+        os.replace(tmp, file_)
+
+    def saveQuery(self, query_, json_):
+        """store SPARQL JSON result of query"""
+        data = gzip.compress(json.dumps(json_).encode())
+        self._write(self._queryFile(query_), data)
+
+    def loadQuery(self, query_):
+        """read SPARQL JSON result of query
+
+        :raise: FileNotFoundError if query was not recorded
+        """
+        file = self._queryFile(query_)
+        if not file.is_file():
+            raise FileNotFoundError(f"SPARQL query not recorded in {self.path}:\n{query_}")
+        self._wait()
+        with gzip.open(file, "rb") as f:
+            return json.loads(f.read().decode())
+
+    def saveDownload(self, url_, file_):
+        """store file downloaded from url"""
+        self._write(self._downloadFile(url_), Path(file_).read_bytes())
+
+    def loadDownload(self, url_, file_):
+        """copy file recorded for url on file_
+
+        :raise: FileNotFoundError if url was not recorded
+        """
+        src = self._downloadFile(url_)
+        if not src.is_file():
+            raise FileNotFoundError(f"download of {url_} not recorded in {self.path}")
+        self._wait()
+        shutil.copyfile(src, file_)
+
+
+# ----------------------------------------------
+def getFixture():
+    """return the process-wide record/replay fixture, create it if need be
+
+    return None if record/replay is not set up (see setupcfg)
+    """
+    global _fixture
+
+    if _fixture is None:
+        mode = getattr(setupcfg, "fixtureMode", None)
+        if mode is None:
+            return None
+
+        with _lock:
+            if _fixture is None:
+                _fixture = Fixture(
+                    setupcfg.fixturePath,
+                    mode,
+                    latency=getattr(setupcfg, "fixtureLatency", None),
+                )
+                _logger.info(f"{mode} ICOS CP responses in {_fixture.path}")
+    return _fixture
+
+
+def resetFixture():
+    """drop the process-wide fixture (ex: after configuration changed)"""
+    global _fixture
+
+    with _lock:
+        _fixture = None
+
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -21,12 +21,12 @@ from pprint import pformat, pprint
 import ontospy
 
 # > conda forge
-import requests
 from requests.exceptions import HTTPError
 
 # import from my project
 import icp2edd.icpobj
 import icp2edd.setupcfg as setupcfg
+import icp2edd.sparqlClient as sparqlClient
 from icp2edd.icpobj import *  # see __all__ in icpobj/__init__.py
 from icp2edd.icpobj.icpObj import ICPObj
 from icp2edd.icpobj.subproperties import hasSubProp
@@ -462,28 +462,30 @@ class IcpOnto(Onto):
             dt = datetime.datetime.fromtimestamp(mtime).strftime("%Y-%m-%d_%H-%M")
             fileout.replace(str(fileout) + "." + dt)
 
-        # Use 'with' to ensure the session context is closed after use.
-        with requests.Session() as s:
-            try:
-                r = s.get(str(self._uri), cookies=cookies, stream=True)
-                # If the response was successful, no Exception will be raised
-                r.raise_for_status()
-            except HTTPError:  # as http_err:
-                # https://en.wikipedia.org/wiki/List_of_HTTP_status_codes
-                # raise HTTPError(f'HTTP error occurred: {http_err}')  # Python 3.6
-                _logger.exception(f"HTTP error occurred:")
-                raise  #
-            except Exception:  # as err:
-                # raise Exception(f'Other error occurred: {err}')  # Python 3.6
-                _logger.exception(f"Other error occurred:")
-                raise  #
-            else:
-                # Success!
-                _logger.info(f"download file {self._uri} on {fileout}")
-                with open(fileout, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024):
-                        if chunk:  # filter out keep-alive new chunks
-                            f.write(chunk)
+        # use session of the shared SPARQL client, to reuse connection to ICOS CP
+        #   Note: overwrite its SPARQL 'Accept' header, to get the ontology as RDF/XML
+        s = sparqlClient.getClient().session
+        headers = {"Accept": "application/rdf+xml, application/xml;q=0.9, */*;q=0.1"}
+        try:
+            r = s.get(str(self._uri), cookies=cookies, headers=headers, stream=True)
+            # If the response was successful, no Exception will be raised
+            r.raise_for_status()
+        except HTTPError:  # as http_err:
+            # https://en.wikipedia.org/wiki/List_of_HTTP_status_codes
+            # raise HTTPError(f'HTTP error occurred: {http_err}')  # Python 3.6
+            _logger.exception(f"HTTP error occurred:")
+            raise  #
+        except Exception:  # as err:
+            # raise Exception(f'Other error occurred: {err}')  # Python 3.6
+            _logger.exception(f"Other error occurred:")
+            raise  #
+        else:
+            # Success!
+            _logger.info(f"download file {self._uri} on {fileout}")
+            with open(fileout, "wb") as f:
+                for chunk in r.iter_content(chunk_size=1024):
+                    if chunk:  # filter out keep-alive new chunks
+                        f.write(chunk)
 
 
 class EddOnto(Onto):
@@ -44,6 +44,10 @@ class Collection(PlainCollection):
 
     """
 
+    # cache tier of metadata, see ICPObj._cacheTtl
+    #   immutable once minted: a new version gets a new PID
+    _tier = "static"
+
     def __init__(self, limit=None, lastversion=None, uri=None):
         """initialise instance of Collection(Entity)
         #Organization.
@@ -26,11 +26,12 @@ from pprint import pformat
 # import from other lib
 import requests
 from requests.exceptions import HTTPError
-from SPARQLWrapper.SmartWrapper import Value as SmartWrapperValue
 
 # import from my project
+import icp2edd.fixture as fixture
 import icp2edd.setupcfg as setupcfg
 from icp2edd.icpobj.cpmeta.staticObject import StaticObject
+from icp2edd.rdfTerm import Term
 
 # --- module's variable ------------------------
 # load logger
@@ -141,21 +142,43 @@ class DataObject(StaticObject):
         super().getMeta()
         #
         for uri in list(self._uri):
-            _ = self.meta[uri]
-            # if no doi create one
-            if "doi" not in _.keys():
-                url = "https://hdl.handle.net/11676/"
-                binding = {"value": url + str(Path(uri).stem), "type": "literal"}
-                _["doi"] = [SmartWrapperValue("doi", binding)]
-            #
-            _logger.info(f"self.meta[{uri}].doi: {_['doi']}")
-
-    def download(self):
+            self._addDoi(uri, self.meta[uri])
+
+    async def getMetaAsync(self):
+        """
+        Add 'doi' to attributes, if need be
+        """
+        await super().getMetaAsync()
+        #
+        for uri in list(self._uri):
+            self._addDoi(uri, self.meta[uri])
+
+    def iterMeta(self, pagesize_):
+        """
+        Add 'doi' to attributes, if need be, of each uri yielded
+        """
+        for uri, binding in super().iterMeta(pagesize_):
+            self._addDoi(uri, binding)
+            yield uri, binding
+
+    def _addDoi(self, uri_, binding_):
+        """if no doi create one"""
+        if "doi" not in binding_.keys():
+            url = "https://hdl.handle.net/11676/"
+            binding_["doi"] = [Term("literal", url + str(Path(uri_).stem))]
+        #
+        _logger.info(f"self.meta[{uri_}].doi: {binding_['doi']}")
+
+    def download(self, meta_=None):
         """download file associated to dataobject
 
         download every file associated with the dataobjects selected on ICOS CP,
         and store them on a temporary directory named by the dataset 'name'
 
+        optionally, metadata could be given as an iterable of (uri, binding),
+        ex: iterMeta output, to start downloading before every metadata are loaded.
+
+        :param meta_: iterable of (uri, binding) [default self.meta.items()]
         :return: dictionary with csv file as key, and dirout as value
 
         >>> t.getMeta()
@@ -163,8 +186,14 @@ class DataObject(StaticObject):
         download file  https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z  on
             .../58GS20190711_SOCAT_enhanced/58GS20190711_SOCAT_enhanced.csv
         """
+        if meta_ is None:
+            meta_ = self.meta.items()
+
+        # record/replay downloaded files, if set up
+        fix = fixture.getFixture()
+
         d = {}
-        for uri, binding in self.meta.items():
+        for uri, binding in meta_:
             # there is at least one binding covering the optional "opt", too
             # uri = binding['uri'].value  # Warning do not convert to Path (https:// => https./)
             pid = uri.split("/")[-1]
@@ -193,7 +222,12 @@ class DataObject(StaticObject):
 
                 url = str(uri).replace("meta", "data")
                 fileout = dirout / filename
-                if filename not in d:
+                if filename not in d and fix is not None and fix.replay:
+                    # copy recorded file, instead of downloading it
+                    d[filename] = dirout
+                    _logger.info(f"replaying file {uri} on {fileout}")
+                    fix.loadDownload(url, fileout)
+                elif filename not in d:
                     # download
                     d[filename] = dirout
 
@@ -236,6 +270,8 @@ class DataObject(StaticObject):
                                 for chunk in r.iter_content(chunk_size=1024):
                                     if chunk:  # filter out keep-alive new chunks
                                         f.write(chunk)
+                            if fix is not None:
+                                fix.saveDownload(url, fileout)
 
         return d
 
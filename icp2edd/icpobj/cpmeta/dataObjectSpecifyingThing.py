@@ -56,6 +56,10 @@ class DataObjectSpecifyingThing(ICPObj):
 
     """
 
+    # cache tier of metadata, see ICPObj._cacheTtl
+    #   rarely modified
+    _tier = "ontology"
+
     def __init__(self, limit=None, uri=None):
         """initialise instance of DataObjectSpecifyingThing(ICPObj).
 
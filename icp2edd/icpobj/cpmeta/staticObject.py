@@ -59,6 +59,10 @@ class StaticObject(Entity):
 
     """
 
+    # cache tier of metadata, see ICPObj._cacheTtl
+    #   immutable once minted: a new version gets a new PID
+    _tier = "static"
+
     def __init__(
         self, limit=None, submfrom=None, submuntil=None, lastversion=None, uri=None
     ):
@@ -16,20 +16,29 @@
 
 # --- import -----------------------------------
 # import from standard lib
+import asyncio
+import hashlib
 import logging
+import re
+import sys
+import time
 import traceback
+from functools import lru_cache, partial
 from pathlib import Path
 from pprint import pformat
+from string import Template
 from urllib.parse import urlparse
 
 # import from other lib
 from dateutil.parser import parse
-from SPARQLWrapper import SPARQLWrapper2
 
 # import from my project
+import icp2edd.queryTrace as queryTrace
 import icp2edd.setupcfg as setupcfg
+import icp2edd.sparqlClient as sparqlClient
 import icp2edd.util as util
 from icp2edd.icpobj.subproperties import hasSubProp
+from icp2edd.rdfTerm import Term
 
 # --- module's variable ------------------------
 # load logger
@@ -86,6 +95,91 @@ _ns = {
     "xml": "http://www.w3.org/XML/1998/namespace",
     "xsd": "http://www.w3.org/2001/XMLSchema#",
 }
+# time to live of cached metadata by cache tier, in seconds (negative: never expire, None: cache ttl)
+_default_tierTtl = {"static": -1, "ontology": 30 * 86400, "mutable": None}
+# suffix of SPARQL variable holding object type of linked URI (see _queryString)
+_objtype_suffix = "__objtype"
+# sentinel of uri not (yet) memoised (None is a memoised value)
+_missing = object()
+# memo shared by every ICPObj during the whole run
+#   {uri: object type URI} (None if no allowed object type)
+typeMemo = util.LRUMemo(maxsize=100000)
+#   {uri: ICPObj subclass}
+klassMemo = util.LRUMemo(maxsize=100000)
+# compiled query templates {(class, object type URI): template}, see _compile
+_templates = {}
+# prefixed name 'ns:name' (not inside IRI '<...>', nor after another word character)
+_prefixed_re = re.compile(r"(?<![\w<:#.-])([A-Za-z][\w-]*):(?=[\w*])")
+# annotation properties, not declared in ICOS CP ontology, with literal value only
+_literal_props = frozenset({"rdfs:comment", "rdfs:label"})
+# datatype properties (prefixed name) of ICOS CP ontology, see _datatypeProperties
+_datatype_props = None
+
+
+# ----------------------------------------------
+def _usedPrefix(query_):
+    """return set of namespaces' prefix used in query
+
+    >>> sorted(_usedPrefix('select ?x where { ?x rdf:type <http://meta.icos-cp.eu/x> ; cpmeta:hasName ?n }'))
+    ['cpmeta', 'rdf']
+    >>> sorted(_usedPrefix('select ?uri where { ?uri rdf:type/rdfs:subClassOf* <http://meta.icos-cp.eu/x> }'))
+    ['rdf', 'rdfs']
+    """
+    return {p for p in _prefixed_re.findall(query_) if p in _ns}
+
+
+@lru_cache(maxsize=None)
+def _prefixBlock(prefix_):
+    """return SPARQL prefix declaration of a (frozen) set of namespaces' prefix"""
+    return "".join(f"prefix {k}: <{_ns[k]}>\n" for k in sorted(prefix_))
+
+
+def _prefixedName(uri_):
+    """return prefixed name 'ns:name' of uri_, if any namespace match, otherwise '<uri_>'
+
+    >>> _prefixedName('http://meta.icos-cp.eu/ontologies/cpmeta/Station'), _prefixedName('http://x.org/y')
+    ('cpmeta:Station', '<http://x.org/y>')
+    """
+    for k, ns in sorted(_ns.items(), key=lambda _: -len(_[1])):
+        name = uri_[len(ns) :]
+        if uri_.startswith(ns) and re.fullmatch(r"[A-Za-z_][\w-]*", name):
+            return f"{k}:{name}"
+    return f"<{uri_}>"
+
+
+@lru_cache(maxsize=None)
+def _allowedFilter(var_, allowed_):
+    """return SPARQL filter keeping only object type listed in allowed_ (tuple of URI)
+
+    >>> _allowedFilter('o__objtype', ('http://meta.icos-cp.eu/ontologies/cpmeta/Station',))
+    'FILTER(?o__objtype IN (cpmeta:Station))'
+    """
+    return "FILTER(?%s IN (%s))" % (var_, ", ".join(_prefixedName(_) for _ in allowed_))
+
+
+def _datatypeProperties():
+    """return set of datatype properties (prefixed name), fetched once from ICOS CP ontology
+
+    value of datatype properties is always a literal, so their object type is never queried,
+    see ICPObj._compile.
+    Note: properties not declared 'owl:DatatypeProperty' are handled as object properties
+    (except _literal_props)
+    """
+    global _datatype_props
+    if _datatype_props is None:
+        query = "select distinct ?p\nwhere {\n\t?p rdf:type owl:DatatypeProperty .\n}"
+        query = _prefixBlock(frozenset(_usedPrefix(query))) + query
+        tier = getattr(setupcfg, "cacheTierTtl", None) or {}
+        try:
+            res = sparqlClient.getClient().query(
+                query, ttl=tier.get("ontology", _default_tierTtl["ontology"])
+            )
+            props = {_prefixedName(b["p"].value) for b in res.bindings if "p" in b}
+        except Exception:
+            _logger.warning("can not list datatype properties, object type of every attribute is queried")
+            props = set()
+        _datatype_props = frozenset(props | _literal_props)
+    return _datatype_props
 
 
 # ----------------------------------------------
@@ -115,6 +209,13 @@ class ICPObj(object):
     'DataObject'
     """
 
+    # SPARQL query strategy ['optional','pivot'], see _compile
+    #   could be overwritten by class, in configuration file(s) (see setupcfg)
+    _strategy = "optional"
+    # cache tier of metadata ['static','ontology','mutable'], see _cacheTtl
+    #   could be overwritten by class, in configuration file(s) (see setupcfg)
+    _tier = "mutable"
+
     def __init__(
         self,
         limit=None,
@@ -185,9 +286,6 @@ class ICPObj(object):
 
         self._ns = {**_ns}
 
-        # list of prefix used in SPARQL query
-        self._prefix = "".join(f"prefix {k}: <{v}>\n" for k, v in self._ns.items())
-
         # dictionary to store metadata
         self.meta = {}
 
@@ -213,45 +311,45 @@ class ICPObj(object):
             for subprop in hasSubProp[prop_]:
                 self._addSubProperties(subprop)
 
-    def _queryString(self):
-        """create SPARQL query string
+    def _compile(self):
+        """compile SPARQL query template, once per class (and object type, and strategy)
 
-        optionally add some filter to the SPARQL query depending on properties available in the object:
-        - filter on URI, in any case
-        - filter on Product, only if object type is 'DataObject' or 'SimpleDataObject'
-        - filter on submission time, if property 'wasSubmittedBy' is available
-        - filter on last version, if property 'isNextVersionOf' is available
-        - filter on number of output, in any case
+        the attribute map (merged with equivalent classes' one), the select and optional blocks,
+        and the prefix block are computed at first call, and then read from _templates.
+        Only filters are left to fill in, see _queryString.
+
+        query strategy:
+        - optional: one OPTIONAL block by attribute, in a single select.
+          multi-valued attributes multiply rows (cartesian product of their values)
+        - pivot: select uri in a sub query, then fetch '?uri ?p ?o' with 'VALUES ?p {...}'.
+          one row by attribute value, rows are pivoted back client side (see _pivot)
+
+        object type of linked URI is queried only for object properties (see _datatypeProperties),
+        and only if listed in 'allowed_objects'
+
+        :return: dictionary {'attr', 'strategy', 'predicate', 'query' (string.Template), 'prefix'}
         """
+        strategy = self._queryStrategy()
+        key = (type(self), self._object, strategy)
+        template = _templates.get(key)
+        if template is not None:
+            self.attr = template["attr"]
+            return template
+
         # add equivalent class attribute
-        if self._equivalentClass:
+        attr = self.attr
+        for k in self._equivalentClass:
             # merge _equivalentClass.attr and self.attr properties.
             # Note:  _equivalentClass.attr's values are overwritten by the self.attr's
-            for k in self._equivalentClass:
-                exec("from icp2edd.icpobj import *")
-                klass = eval(k)
-                inst = klass()
-                # TODO check every attribute value are unique, below too restrictive
-                # if set(inst.attr.keys()) & set(self.attr.keys()):
-                #     # there is an intersection
-                #     _logger.debug(f"{self._object} attributes: {self.attr.keys()}")
-                #     _logger.debug(f"{inst._object} attributes: {inst.attr.keys()}")
-                #     _logger.error(f"there is an intersection between attributes keys "
-                #                   f"of {self._object} and {inst._object}")
-                # else:
-                #     # no intersection
-                self.attr = {**inst.attr, **self.attr}
-
-        select = f"select ?uri"
-        option = ""
-        for k, v in self.attr.items():
-            select = select + " ?" + v
-            option = option + "\n\tOPTIONAL { ?uri %s ?%s .}" % (k, v)
-
-        # start where block
-        query = select + "\nwhere {"
+            import icp2edd.icpobj
+
+            klass = vars(icp2edd.icpobj)[k]
+            attr = {**klass().attr, **attr}
+
         # filter: uri
-        query = query + f"\n\t{self._filterObj(self._uri)} # _filterObj(uri)"
+        where = "\n\t${uri} # _filterObj(uri)"
+        # filter: keyset pagination
+        where = where + "\n\t${after} # _filterAfter(after)"
 
         # object type name
         objtype = None
@@ -260,51 +358,227 @@ class ICPObj(object):
 
         if objtype in ("DataObject", "SimpleDataObject"):
             # filter: product
-            query = (
-                query
-                + f"\n\t{self._filterProduct(self._product)} # _filterProduct(product)"
-            )
+            where = where + "\n\t${product} # _filterProduct(product)"
             # add main object
-            query = query + "\n\t ?uri cpmeta:hasObjectSpec ?spec ."
+            where = where + "\n\t ?uri cpmeta:hasObjectSpec ?spec ."
         else:
             # add main object
-            query = query + "\n\t ?uri rdf:type/rdfs:subClassOf* <%s> ." % self._object
+            where = where + "\n\t ?uri rdf:type/rdfs:subClassOf* <%s> ." % self._object
 
+        # prefixes used by filters, not yet filled in
+        used = set()
         # filter: submission time
-        if "cpmeta:wasSubmittedBy" in self.attr.keys():
-            query = (
-                query + "\n\t?uri cpmeta:wasSubmittedBy ?subm ."
+        if "cpmeta:wasSubmittedBy" in attr.keys():
+            used.add("xsd")
+            where = (
+                where + "\n\t?uri cpmeta:wasSubmittedBy ?subm ."
                 "\n\t?subm prov:endedAtTime ?submTime ;"
                 "\n\t\tprov:wasAssociatedWith ?submitter ."
-                f"\n\t{self._filterSubmTime(self._from, op_='>=')} "
-                f"# _filterSubmTime(from, op_='>=')"
-                f"\n\t{self._filterSubmTime(self._until, op_='<=')} "
-                f"# _filterSubmTime(until, op_='<=')"
+                "\n\t${submfrom} # _filterSubmTime(from, op_='>=')"
+                "\n\t${submuntil} # _filterSubmTime(until, op_='<=')"
             )
 
         # filter last version
-        if "cpmeta:isNextVersionOf" in self.attr.keys():
+        if "cpmeta:isNextVersionOf" in attr.keys():
+            where = where + "\n\t${lastversion} # _filterLastVersion(lastversion)"
+
+        # object type of linked URI: only allowed ones, only for object properties
+        allowed = tuple(setupcfg.allowed_objects or ())
+        literal = _datatypeProperties() if strategy != "pivot" else ()
+
+        # {predicate URI: attribute}, see _pivot
+        predicate = {}
+        # attributes whose linked URI object type is selected, see _groupby
+        linked = frozenset(v for k, v in attr.items() if v != "type" and k not in literal)
+        if strategy == "pivot":
+            # attribute 'type' is dropped, see _groupby
+            for k, v in attr.items():
+                if v != "type":
+                    prefix, name = k.split(":", 1)
+                    predicate[_ns[prefix] + name] = v
+
+            # select uri in sub query (filters and limit apply on uri, not on rows),
+            # then one row by attribute value
             query = (
-                query
-                + f"\n\t{self._filterLastVersion(self._lastversion)} # _filterLastVersion(lastversion)"
+                "select ?uri ?p ?o ?o%s" % _objtype_suffix
+                + "\nwhere {"
+                + "\n\t{"
+                + "\n\tselect distinct ?uri"
+                + "\n\twhere {"
+                + where
+                + "\n\t}"
+                + "\n\t${tail}"
+                + "\n\t}"
+                + "\n\tOPTIONAL {"
+                + "\n\t\tVALUES ?p { %s }" % " ".join(k for k, v in attr.items() if v != "type")
+                + "\n\t\t?uri ?p ?o ."
+                + "\n\t\tOPTIONAL { FILTER(isIRI(?o)) ?o rdf:type ?o%s . %s }"
+                % (_objtype_suffix, _allowedFilter("o" + _objtype_suffix, allowed))
+                + "\n\t}"
+                + "\n}"
             )
+        else:
+            select = f"select ?uri"
+            option = ""
+            for k, v in attr.items():
+                select = select + " ?" + v
+                if v == "type" or k in literal:
+                    # attribute 'type' is dropped, see _groupby
+                    option = option + "\n\tOPTIONAL { ?uri %s ?%s .}" % (k, v)
+                else:
+                    # get (allowed) object type of linked URI
+                    select = select + " ?" + v + _objtype_suffix
+                    option = option + "\n\tOPTIONAL { ?uri %s ?%s . OPTIONAL { ?%s rdf:type ?%s%s . %s }}" % (
+                        k,
+                        v,
+                        v,
+                        v,
+                        _objtype_suffix,
+                        _allowedFilter(v + _objtype_suffix, allowed),
+                    )
+
+            # where block, with optional request (all attributes)
+            query = select + "\nwhere {" + where + "\n" + option + "\n}\n${tail}"
+
+        template = {
+            "attr": attr,
+            "strategy": strategy,
+            "predicate": predicate,
+            "linked": linked,
+            "query": Template(query),
+            "prefix": _prefixBlock(frozenset(_usedPrefix(query) | used)),
+            # cached records of a former template are not read, see _recordKey
+            "hash": hashlib.sha256(query.encode()).hexdigest()[:16],
+        }
+        _templates[key] = template
+        _logger.debug(f"compile query template of {key}")
+
+        self.attr = attr
+        return template
+
+    def _queryStrategy(self):
+        """return SPARQL query strategy of this class ['optional','pivot']
+
+        strategy set up in configuration file(s) overwrite class one
+        """
+        strategy = getattr(setupcfg, "sparqlStrategy", None) or {}
+        return strategy.get(type(self).__name__, self._strategy)
+
+    def _cacheTier(self):
+        """return cache tier of this class ['static','ontology','mutable']
 
-        # add optional request (all attributes)
-        query = query + "\n" + option
-        # close where block
-        query = query + "\n}"
-        # filter: limit
-        query = query + f"\n{self._filterLimit(self._limit)}  # _filterLimit(limit)"
+        cache tier set up in configuration file(s) overwrite class one
+        """
+        tier = getattr(setupcfg, "cacheTier", None) or {}
+        return tier.get(type(self).__name__, self._tier)
+
+    def _cacheTtl(self):
+        """return time to live of cached metadata records, in seconds [None: cache ttl], see _cacheTier"""
+        tier = self._cacheTier()
+        ttl = getattr(setupcfg, "cacheTierTtl", None) or {}
+        return ttl.get(tier, _default_tierTtl[tier])
+
+    def _queryString(self, after_=None, pagesize_=None, uri_=None):
+        """create SPARQL query string
+
+        optionally add some filter to the SPARQL query depending on properties available in the object:
+        - filter on URI, in any case ('uri_' if given, instead of instance's uri)
+        - filter on URI greater or equal to 'after_' (greater with 'pivot' strategy),
+          and sort by URI, if paginated (see iterMeta)
+        - filter on Product, only if object type is 'DataObject' or 'SimpleDataObject'
+        - filter on submission time, if property 'wasSubmittedBy' is available
+        - filter on last version, if property 'isNextVersionOf' is available
+        - filter on number of output, in any case
+
+        for each object property, the allowed object type of the linked URI (if any) is also selected,
+        in variable '<attribute>__objtype', see _groupby
+        """
+        template = self._compile()
+
+        if pagesize_:
+            # keyset pagination: sort by uri, and limit to page size
+            tail = f"ORDER BY ?uri\n{self._filterLimit(pagesize_)}  # _filterLimit(pagesize)"
+        else:
+            # filter: limit
+            tail = f"{self._filterLimit(self._limit)}  # _filterLimit(limit)"
+
+        query = template["query"].substitute(
+            uri=self._filterObj(self._uri if uri_ is None else uri_),
+            after=self._filterAfter(
+                after_, op_=">" if template["strategy"] == "pivot" else ">="
+            ),
+            product=self._filterProduct(self._product),
+            submfrom=self._filterSubmTime(self._from, op_=">="),
+            submuntil=self._filterSubmTime(self._until, op_="<="),
+            lastversion=self._filterLastVersion(self._lastversion),
+            tail=tail,
+        )
 
         return query
 
-    def _query(self, queryString_):
+    def _query(self, queryString_, prefix_=None, ttl_=None):
         """
         This functions run a sparql query on ICOS CP.
         Here we select metadata from every stations store in the ICOS CP.
 
+        Note: query is sent through the process-wide SPARQL client (see sparqlClient),
+        so connections are kept alive and reused between queries.
+        Note: if set up, query is recorded in the query trace (see queryTrace)
+
+        :param prefix_: prefix block of the query, [default only prefixes used in query]
+        :param ttl_: time to live of the cached response, in seconds [default cache ttl, 0: not cached]
+
         :return: SPARQLWrapper Bindings object (each binding is a dictionary)
         """
+        client = sparqlClient.getClient()
+        query = self._prefixed(queryString_, prefix_)
+        info = {}
+        start = time.perf_counter()
+        try:
+            res = client.query(query, ttl=ttl_, info_=info)
+        except Exception as err:
+            _logger.exception("ERROR with SPARQL query")
+            self._trace(query, start, info, error_=err)
+            raise  #
+        self._trace(query, start, info, res_=res)
+        return res
+
+    async def _queryAsync(self, queryString_, prefix_=None, ttl_=None):
+        """asynchronous version of _query
+
+        Note: number of concurrent queries, and their duration, are bounded by the SPARQL client
+        (see sparqlClient.SparqlClient.aquery)
+        """
+        client = sparqlClient.getClient()
+        query = self._prefixed(queryString_, prefix_)
+        info = {}
+        start = time.perf_counter()
+        try:
+            res = await client.aquery(query, ttl=ttl_, info_=info)
+        except Exception as err:
+            _logger.exception("ERROR with SPARQL query")
+            self._trace(query, start, info, error_=err)
+            raise  #
+        self._trace(query, start, info, res_=res)
+        return res
+
+    def _trace(self, query_, start_, info_, res_=None, error_=None):
+        """record query in the query trace, if set up (see queryTrace)"""
+        tracer = queryTrace.getTracer()
+        if tracer is None:
+            return
+        tracer.record(
+            type(self).__name__,
+            queryTrace.callSite(),
+            query_,
+            time.perf_counter() - start_,
+            info_=info_,
+            rows_=None if res_ is None else len(res_.bindings),
+            error_=None if error_ is None else repr(error_),
+        )
+
+    def _prefixed(self, queryString_, prefix_=None):
+        """return query string, with its prefix block"""
         if not isinstance(queryString_, str):
             raise TypeError(
                 f'Invalid type value. queryString: \n"""{queryString_}"""\nmust be string, '
@@ -312,22 +586,21 @@ class ICPObj(object):
             )
 
         _logger.debug(f"queryString_:\n {queryString_}")
-        sparql = SPARQLWrapper2("https://meta.icos-cp.eu/sparql")
 
-        query = self._prefix + queryString_
-        sparql.setQuery(query)
-        try:
-            return sparql.query()
-        except Exception:  # as err:
-            _logger.exception("ERROR with SPARQL query")
-            raise  #
+        if prefix_ is None:
+            prefix_ = _prefixBlock(frozenset(_usedPrefix(queryString_)))
+        return prefix_ + queryString_
 
     def _getObject(self):
-        """ """
+        """return object type URI of self._uri, look first in memo"""
         if not setupcfg.allowed_objects:
             _logger.warning("no 'allowed_objects' list")
             return self._object
         else:
+            _ = typeMemo.get(self._uri, _missing)
+            if _ is not _missing:
+                return _
+
             if self._is_url(self._uri):
                 queryString = (
                     """
@@ -359,20 +632,34 @@ class ICPObj(object):
                 uri = result["objtype"].value
                 # check is uri
                 if self._is_url(uri):
+                    typeMemo.put(self._uri, uri)
                     return uri
                 else:
                     raise TypeError(f"Invalid object format: {uri}")
 
+            typeMemo.put(self._uri, None)
+
     def _getObjectType(self):
 
         uri = self._object
+        return self._typeName(uri)
+
+    def _typeName(self, uri_):
+        """
+        given object type URI, return object type name
+
+        >>> t._typeName('http://meta.icos-cp.eu/ontologies/cpmeta/DataObject')
+        'cpmeta.DataObject'
+        >>> t._typeName('http://www.w3.org/ns/prov#Entity')
+        'prov.Entity'
+        """
         # check is uri
-        if self._is_url(uri):
-            _ = Path(uri).name
+        if self._is_url(uri_):
+            _ = Path(uri_).name
             if "#" in _:
                 otype = _.replace("#", ".")
             else:
-                ns = Path(uri).parent.name
+                ns = Path(uri_).parent.name
                 otype = f"{ns}.{_}"
             # if otype in globals().keys():
             #     print(f'object: {self._object}\n objtype: {otype}')
@@ -380,10 +667,115 @@ class ICPObj(object):
             # else:
             #     raise ValueError(f'Unknown object: {otype}')
         else:
-            raise TypeError(f"Invalid object format: {uri}")
+            raise TypeError(f"Invalid object format: {uri_}")
+
+    @staticmethod
+    def memoStats():
+        """return statistics of the memo shared during the run"""
+        return {"type": typeMemo.stats(), "klass": klassMemo.stats()}
+
+    def resolveTypes(self, uris_):
+        """
+        given a list of URI, return their object type name, using as few queries as possible
+
+        URI already memoised are not queried again, the others are resolved by chunk,
+        as large as the SPARQL client's budget allows, in a single query each:
+            select ?uri ?objtype where { VALUES ?uri {...} ?uri rdf:type ?objtype }
+
+        Note: only object type listed in 'allowed_objects' are kept,
+        URI without allowed object type are set to None.
+
+        :param uris_: list of ICOS CP URI
+        :return: {uri: objtype, ...} ex: {'https://meta.icos-cp.eu/objects/...': 'cpmeta.DataObject'}
+        """
+        uris = list(dict.fromkeys(uris_))
+        output = dict.fromkeys(uris)
+        if not uris:
+            return output
+
+        if not setupcfg.allowed_objects:
+            _logger.warning("no 'allowed_objects' list")
+            return output
+
+        # look first in memo
+        unknown = []
+        for uri in uris:
+            _ = typeMemo.get(uri, _missing)
+            if _ is _missing:
+                unknown.append(uri)
+            elif _ is not None:
+                output[uri] = self._typeName(_)
+
+        def run(chunk_):
+            queryString = """
+                select ?uri ?objtype
+                where{
+                 %s
+                 ?uri rdf:type ?objtype
+                }
+                """ % self._filterObj(list(chunk_))
+            return self._query(queryString)
+
+        for chunk in util.chunksByBytes(unknown, sparqlClient.getClient().budget):
+            res = self._bisect(run, chunk)
+            found = {}
+            for result in res.bindings:
+                objtype = result["objtype"].value
+                # keep only icos-cp object
+                if objtype not in setupcfg.allowed_objects:
+                    continue
+
+                uri = result["uri"].value
+                if uri not in found:
+                    found[uri] = objtype
+                    output[uri] = self._typeName(objtype)
+                else:
+                    # check only one result
+                    _logger.error(
+                        f"Invalid number of result, several object type for uri:{uri}"
+                    )
+
+            for uri in chunk:
+                typeMemo.put(uri, found.get(uri))
+
+        return output
+
+    def resolveKlass(self, uri_):
+        """
+        given URI, return the ICPObj subclass to be used to explore it (None if unknown)
+
+        subclass is memoised, to avoid resolving it again during the run
+        """
+        klass = klassMemo.get(uri_)
+        if klass is None:
+            objtype = self.resolveTypes([uri_])[uri_]
+            if objtype is None:
+                return None
+            # load subclass from icpobj package (see icpobj/__init__.py)
+            import icp2edd.icpobj
+
+            klass = vars(icp2edd.icpobj)[objtype]
+            klassMemo.put(uri_, klass)
+        return klass
 
     def getProperties(self):
         """reutrn a list of properties associated to this object"""
+        res = self._query(self._propertiesQueryString())
+        # keep only unique properties
+        list_props = set(v.value for r in res.bindings for k, v in r.items())
+
+        return list_props
+
+    async def getPropertiesAsync(self):
+        """asynchronous version of getProperties"""
+        res = await self._queryAsync(self._propertiesQueryString())
+        # keep only unique properties
+        list_props = set(v.value for r in res.bindings for k, v in r.items())
+
+        return list_props
+
+    def _propertiesQueryString(self):
+        """create SPARQL query string, to list properties associated to this object"""
 
         # first check otype != owl:Class
         if self.objtype is not None:
@@ -400,11 +792,7 @@ class ICPObj(object):
             else:
                 raise TypeError(f"Invalid object format: {self._uri}")
 
-            res = self._query(queryString)
-            # keep only unique properties
-            list_props = set(v.value for r in res.bindings for k, v in r.items())
-
-            return list_props
+            return queryString
 
         else:
             raise TypeError(f"Invalid object format: {self._uri}")
@@ -415,11 +803,19 @@ class ICPObj(object):
         with metadata, and their attributes from ICOS CP
 
         meta = {uri: binding, ...}
-            binding = {variable: [SPARQLWrapper.Value, ...], ...}
+            binding = {variable: [Term, ...], ...}
         """
-        queryString = self._queryString()
+        res = self._queryMeta()
+        self.meta = self._groupby(res)
         #
-        res = self._query(queryString)
+        _logger.debug(f"self.meta: {pformat(self.meta)}")
+
+        # create/overwrite list of uri
+        self._uri = list(self.meta.keys())
+
+    async def getMetaAsync(self):
+        """asynchronous version of getMeta"""
+        res = await self._queryMetaAsync()
         self.meta = self._groupby(res)
         #
         _logger.debug(f"self.meta: {pformat(self.meta)}")
@@ -427,6 +823,257 @@ class ICPObj(object):
         # create/overwrite list of uri
         self._uri = list(self.meta.keys())
 
+    def iterMeta(self, pagesize_):
+        """
+        get metadata from ICOS CP, page by page, and yield each uri's metadata as soon as complete
+
+        use keyset pagination: query sorted by uri, limited to 'pagesize_' rows,
+        next page starts from the last uri seen (FILTER(STR(?uri) >= last)).
+        As the last uri of a page could be incomplete, it is only yielded with the next page.
+        If a single uri fills the page, the page size is doubled.
+
+        with 'pivot' strategy (see _compile), page size limits the number of uri, not of rows,
+        so every uri of a page is complete, and next page starts after the last uri.
+
+        Note: instance's dictionary meta and list of uri are filled up along the way
+        Note: if set up, limit applies on the number of uri yielded (not on rows by page)
+
+        :param pagesize_: number of rows (number of uri with 'pivot' strategy) by page
+        :yield: (uri, binding), binding = {variable: [Term, ...], ...}
+        """
+        pagesize = int(pagesize_)
+        if pagesize <= 0:
+            raise ValueError(f"Invalid page size -{pagesize_}-")
+
+        pivot = self._compile()["strategy"] == "pivot"
+        limit = int(self._limit or 0)
+
+        self.meta = {}
+        after = None
+        size = pagesize
+        while True:
+            res = self._queryMeta(after_=after, pagesize_=size)
+            nrows = len(res.bindings)
+            page = self._groupby(res)
+
+            if pivot:
+                # uri are complete
+                uris = sorted(page.keys())
+                last_page = len(uris) < size
+                if uris:
+                    after = uris[-1]
+            else:
+                # uri are sorted
+                uris = list(page.keys())
+                last_page = nrows < size
+                if not last_page:
+                    if len(uris) <= 1:
+                        # a single uri fills the page, enlarge it
+                        size *= 2
+                        _logger.debug(f"increase page size to {size} rows")
+                        continue
+                    # last uri could be incomplete, get it again with next page
+                    after = uris.pop()
+                    size = pagesize
+
+            if limit:
+                uris = uris[: limit - len(self.meta)]
+            for uri in uris:
+                self.meta[uri] = page[uri]
+                yield uri, page[uri]
+
+            if last_page or (limit and len(self.meta) >= limit):
+                break
+
+        # create/overwrite list of uri
+        self._uri = list(self.meta.keys())
+
+    def _queryMeta(self, after_=None, pagesize_=None):
+        """run metadata query (see _queryString), and return SPARQL query output
+
+        with 'pivot' strategy, output is pivoted back, as for 'optional' one (see _pivot)
+        if query on a list of uri is rejected by the endpoint, list is bisected (see _bisect)
+        metadata of given uri are read from cache, uri by uri, only missing ones are queried (see _recordable)
+        """
+        template = self._compile()
+
+        def run(uri_, ttl_=None):
+            queryString = self._queryString(after_=after_, pagesize_=pagesize_, uri_=uri_)
+            return self._query(queryString, prefix_=template["prefix"], ttl_=ttl_)
+
+        if not self._recordable(pagesize_):
+            # listing, filtered, or paginated query: not cached
+            run = partial(run, ttl_=0)
+            res = self._bisect(run, self._uri) if self._bisectable(pagesize_) else run(self._uri)
+            return self._pivoted(res, template)
+
+        rows, missing = self._cachedRecords(template)
+        res = None
+        if missing:
+            res = self._pivoted(self._bisect(run, missing), template)
+            self._storeRecords(template, res, missing)
+        return self._withRecords(res, rows)
+
+    async def _queryMetaAsync(self):
+        """asynchronous version of _queryMeta (without pagination)"""
+        template = self._compile()
+
+        async def run(uri_, ttl_=None):
+            queryString = self._queryString(uri_=uri_)
+            return await self._queryAsync(queryString, prefix_=template["prefix"], ttl_=ttl_)
+
+        if not self._recordable():
+            # listing, or filtered, query: not cached
+            run = partial(run, ttl_=0)
+            res = await self._bisectAsync(run, self._uri) if self._bisectable() else await run(self._uri)
+            return self._pivoted(res, template)
+
+        rows, missing = self._cachedRecords(template)
+        res = None
+        if missing:
+            res = self._pivoted(await self._bisectAsync(run, missing), template)
+            self._storeRecords(template, res, missing)
+        return self._withRecords(res, rows)
+
+    def _pivoted(self, res, template_):
+        """return SPARQL query output, pivoted back with 'pivot' strategy (see _pivot)"""
+        if template_["strategy"] == "pivot":
+            res = self._pivot(res, template_["predicate"])
+        return res
+
+    def _recordable(self, pagesize_=None):
+        """return True if metadata are cached uri by uri, with the time to live of the cache tier
+
+        Note: only metadata of given uri, listing, filtered, or paginated, queries could get new objects,
+        so they are not cached
+        """
+        return not (
+            self._uri is None
+            or pagesize_
+            or self._limit
+            or self._from
+            or self._until
+            or self._product
+            or self._lastversion
+        )
+
+    def _recordKey(self, template_, uri_):
+        """return cache key of metadata record of uri_ (rows of uri_), for this class and query template"""
+        return f"# record {type(self).__name__} {template_['hash']}\n{uri_}"
+
+    def _cachedRecords(self, template_):
+        """return rows of given uri read from cache, and list of uri not cached"""
+        uris = [self._uri] if isinstance(self._uri, str) else list(self._uri)
+        keys = {uri: self._recordKey(template_, uri) for uri in uris}
+        cached = sparqlClient.getClient().getRecords(keys.values())
+
+        rows = [row for uri in uris if keys[uri] in cached for row in cached[keys[uri]]]
+        missing = [uri for uri in uris if keys[uri] not in cached]
+        _logger.debug(f"{len(uris) - len(missing)}/{len(uris)} {type(self).__name__} records cached")
+        return rows, missing
+
+    def _storeRecords(self, template_, res, uris_):
+        """store rows of each uri of uris_, with the time to live of the cache tier (see _cacheTtl)
+
+        Note: uri without rows (not found, yet) are stored with cache ttl, not the tier one
+        """
+        records = {self._recordKey(template_, uri): [] for uri in uris_}
+        for row in sparqlClient.toRows(res.bindings):
+            key = self._recordKey(template_, row["uri"]["value"])
+            if key in records:
+                records[key].append(row)
+        client = sparqlClient.getClient()
+        client.putRecords({k: v for k, v in records.items() if v}, ttl=self._cacheTtl())
+        client.putRecords({k: v for k, v in records.items() if not v})
+
+    def _withRecords(self, res, rows_):
+        """return SPARQL query output res, with cached rows_"""
+        if res is None:
+            return sparqlClient.fromRows(rows_)
+        if rows_:
+            res.bindings[:0] = sparqlClient.fromRows(rows_).bindings
+        return res
+
+    def _bisectable(self, pagesize_=None):
+        """return True if metadata query could be split on list of uri
+
+        Note: not with pagination, nor limit, as they apply to the whole list
+        """
+        return isinstance(self._uri, list) and not pagesize_ and not self._limit
+
+    def _bisect(self, run_, items_):
+        """
+        run query on a list of items (inlined in the query),
+        if the endpoint rejects or times out the query, bisect the list, and retry each half
+
+        :param run_: function, list of items -> SPARQL query output
+        :param items_: list of items (uri, filename,...)
+        :return: SPARQL query output, bindings of every parts concatenated
+        """
+        try:
+            return run_(items_)
+        except Exception as err:
+            if len(items_) <= 1 or not sparqlClient.isRejected(err):
+                raise
+            half = len(items_) // 2
+            _logger.warning(f"query on {len(items_)} items rejected, retry on halves: {err}")
+            res = self._bisect(run_, items_[:half])
+            res.bindings.extend(self._bisect(run_, items_[half:]).bindings)
+            return res
+
+    async def _bisectAsync(self, run_, items_):
+        """asynchronous version of _bisect, halves are queried concurrently"""
+        try:
+            return await run_(items_)
+        except Exception as err:
+            if len(items_) <= 1 or not sparqlClient.isRejected(err):
+                raise
+            half = len(items_) // 2
+            _logger.warning(f"query on {len(items_)} items rejected, retry on halves: {err}")
+            res, other = await asyncio.gather(
+                self._bisectAsync(run_, items_[:half]),
+                self._bisectAsync(run_, items_[half:]),
+            )
+            res.bindings.extend(other.bindings)
+            return res
+
+    def _pivot(self, res, predicate_):
+        """
+        pivot bindings of a 'pivot' SPARQL query output, in place
+
+        bindings = [
+          {uri: Value1, p: Value(var1 predicate), o: Value11 },
+          {uri: Value1, p: Value(var2 predicate), o: Value21, o__objtype: Value(type of Value21) },
+          {uri: Value1, p: Value(var2 predicate), o: Value22 },
+        ]
+
+        become
+
+        bindings = [
+          {uri: Value1, var1: Value11 },
+          {uri: Value1, var2: Value21, var2__objtype: Value(type of Value21) },
+          {uri: Value1, var2: Value22 },
+        ]
+
+        :param res: SPARQL query output
+        :param predicate_: dictionary {predicate URI: attribute}
+        :return: SPARQL query output
+        """
+        objtype = "o" + _objtype_suffix
+        bindings = []
+        for binding in res.bindings:
+            row = {"uri": binding["uri"]}
+            p = binding.get("p")
+            if p is not None:
+                k = predicate_[p.value]
+                row[k] = binding["o"]
+                if objtype in binding:
+                    row[k + _objtype_suffix] = binding[objtype]
+            bindings.append(row)
+
+        res.bindings = bindings
+        return res
+
     def _groupby(self, res):
         """
         combine bindings of a SPARQL query output in a dictionary
@@ -440,43 +1087,75 @@ class ICPObj(object):
           {var1: Value11, var2: Value22, var3: Value33 }
         ]
 
-        out = { uri: { var1: [Value11],
-                       var2: [Value21, Value22],
-                       var3: [Value31, Value32, Value33]
+        out = { uri: { var1: [Term11],
+                       var2: [Term21, Term22],
+                       var3: [Term31, Term32, Term33]
                       }
         }
 
+         each SPARQL Value is stored as an immutable Term (see rdfTerm), with interned uri strings.
+
          Furthermore, if the type of the SPARQL Value is 'uri' but not point to a 'meta.icos-cp.eu' element,
          the type value is change to 'literal' to avoid later issue digging into those URI
 
          drop useless attribute 'type'
 
+         object type of linked URI (variables '<attribute>__objtype'), are not kept as attribute,
+         but attached to the Term of type 'uri' (Term.objtype), as typed edge.
+         Only object type listed in 'allowed_objects' are kept, otherwise Term.objtype is None.
+         object type is memoised (see typeMemo) only for attributes whose object type is selected.
+
+        values are deduplicated on (type, value, datatype, lang), keeping first seen order,
+        so grouping is linear in the number of rows.
+
         :param res: SPARQL query output
-        :return: {uri: {variable: [SPARQLWrapper.Value, ...], ...}, ...}
+        :return: {uri: {variable: [Term, ...], ...}, ...}
         """
         # exemple SPARQL output variables: 'uri', 'static_object_citation',...
+        # {uri: {variable: {(type, value, datatype, lang): None}}}
         dict1 = {}
+        # object type of linked uri {uri: objtype}
+        edges = {}
         for binding in res.bindings:
             uri = binding["uri"].value
-            if uri not in dict1:
-                dict1[uri] = {}
-            #
-            dict2 = dict1[uri]
+            dict2 = dict1.get(uri)
+            if dict2 is None:
+                dict2 = dict1[uri] = {}
 
             # remove useless key 'type'
             binding.pop("type", None)
             for k, v in binding.items():
-                if k not in dict2.keys():
-                    dict2[k] = []
+                if k.endswith(_objtype_suffix):
+                    # keep only icos-cp object
+                    linked = binding.get(k[: -len(_objtype_suffix)])
+                    if linked is not None and v.value in setupcfg.allowed_objects:
+                        edges.setdefault(linked.value, v.value)
+                    continue
+
                 # change type to avoid later issue digging into those URI-
-                if v.type == "uri" and "meta.icos-cp.eu" not in v.value:
-                    v.type = "literal"
-                # Using a in b is simply translates to b.__contains__(a)
-                if v not in dict2[k]:
-                    dict2[k] += [v]
-                else:
-                    pass
-                    # already registered
+                vtype = v.type
+                if vtype == "uri" and "meta.icos-cp.eu" not in v.value:
+                    vtype = "literal"
+                # insertion-ordered set of values (already registered values are skipped)
+                dict2.setdefault(k, {})[(vtype, v.value, v.datatype, v.lang)] = None
+
+        # ordered set of values to list of Term,
+        # attach object type to linked uri, and memoise it (only if selected, see _compile)
+        linked = self._compile()["linked"]
+        for dict2 in dict1.values():
+            for k in list(dict2):
+                values = []
+                for vtype, value, datatype, lang in dict2.pop(k):
+                    objtype = None
+                    if vtype == "uri" and k != "uri":
+                        objtype = edges.get(value)
+                        if k in linked:
+                            typeMemo.put(value, objtype)
+                        if objtype is not None:
+                            objtype = self._typeName(objtype)
+                    values.append(Term(vtype, value, datatype=datatype, lang=lang, objtype=objtype))
+                dict2[sys.intern(k)] = values
+
         return dict1
 
     def show(self, print_=False):
@@ -591,6 +1270,36 @@ class ICPObj(object):
         else:
             return ""
 
+    def _filterAfter(self, uri_=None, op_=">="):
+        """
+        create a string to inject into sparql queries to select object
+        with ICOS CP URI greater or equal to 'uri_' (keyset pagination)
+
+        :param uri_: string of ICOS CP uri
+        :param op_: comparison operator ['>=','>']
+
+        :return: string
+
+        >>> t._filterAfter()
+        ''
+        >>> t._filterAfter('https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z')
+        'FILTER( STR(?uri) >= "https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z" )'
+        >>> t._filterAfter('toto')
+        Traceback (most recent call last):
+            ...
+            raise TypeError('Invalid object format: {}'.format(uri_))
+        TypeError: Invalid object format: toto
+        >>> t._filterAfter('https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z', op_='>')
+        'FILTER( STR(?uri) > "https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z" )'
+        """
+        if uri_:
+            if self._is_url(uri_):
+                return 'FILTER( STR(?uri) %s "%s" )' % (op_, uri_)
+            else:
+                raise TypeError("Invalid object format: {}".format(uri_))
+        else:
+            return ""
+
     def _filterProduct(self, product_=""):
         """
         create a string to inject into sparql queries to select object
@@ -728,18 +1437,24 @@ class ICPObj(object):
             return ""
 
     def listUri(self, filename_):
-        """given filename, return uri on ICOS CP"""
+        """given filename (or list of filename), return uri on ICOS CP
+
+        if the endpoint rejects the query, list of filename is bisected (see _bisect)
+        """
         if filename_:
             if isinstance(filename_, str):
-                filenames = '"{}"'.format(filename_)
+                filenames = [filename_]
             elif isinstance(filename_, list) and all(
                 isinstance(n, str) for n in filename_
             ):
-                filenames = " ".join('"{}"'.format(w) for w in filename_)
+                filenames = filename_
             else:
                 raise TypeError("Invalid product format: {}".format(filename_))
 
-            if self._is_url(self._object):
+            if not self._is_url(self._object):
+                raise TypeError(f"Invalid object format: {self._object}")
+
+            def run(filenames_):
                 queryString = """
                 select ?uri
                 where{
@@ -749,13 +1464,13 @@ class ICPObj(object):
                  FILTER NOT EXISTS {[] cpmeta:isNextVersionOf ?uri}
                 }
                 """ % (
-                    filenames,
+                    " ".join('"{}"'.format(w) for w in filenames_),
                     self._object,
                 )
-            else:
-                raise TypeError(f"Invalid object format: {self._object}")
+                # last version could change: not cached
+                return self._query(queryString, ttl_=0)
 
-            res = self._query(queryString)
+            res = self._bisect(run, filenames)
             return [r["uri"].value for r in res.bindings]
 
         else:
@@ -51,6 +51,10 @@ class Concept(ICPObj):
 
     """
 
+    # cache tier of metadata, see ICPObj._cacheTtl
+    #   rarely modified
+    _tier = "ontology"
+
     def __init__(self, limit=None, uri=None):
         """initialise instance of Concept(ICPObj).
 
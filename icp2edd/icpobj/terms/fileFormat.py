@@ -46,6 +46,10 @@ class FileFormat(ICPObj):
 
     """
 
+    # cache tier of metadata, see ICPObj._cacheTtl
+    #   rarely modified
+    _tier = "ontology"
+
     def __init__(self, limit=None, uri=None):
         """initialise instance of FileFormat(ICPObj).
 
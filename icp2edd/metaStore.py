@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# metaStore.py
+
+"""
+    This module set up a store of metadata, filled in place while exploring ICOS CP.
+
+    The store is a dictionary {uri: binding, ...}, where metadata of another ICOS CP object
+    are merged in place, without copying the whole store: uri already stored are kept
+    (first writer wins), new ones are added.
+
+    Example usage:
+
+    from icp2edd.metaStore import MetaStore
+
+    meta = MetaStore()
+    meta.merge(dataObject.meta)         # add metadata not already stored
+    meta[uri]                           # binding of uri
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import logging
+
+# import from other lib
+# import from my project
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------
+class MetaStore(dict):
+    """
+    dictionary of metadata {uri: binding, ...}, merged in place, first writer wins
+
+    >>> meta = MetaStore({'a': {'x': [1]}})
+    >>> meta.merge({'a': {'x': [2]}, 'b': {}})
+    1
+    >>> meta
+    {'a': {'x': [1]}, 'b': {}}
+    """
+
+    def merge(self, meta_):
+        """add metadata of uri not already stored
+
+        same as meta = {**meta_, **meta}, without copying the store
+
+        :param meta_: dictionary {uri: binding, ...}
+        :return: number of uri added
+        """
+        n = len(self)
+        for uri, binding in meta_.items():
+            self.setdefault(uri, binding)
+        return len(self) - n
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
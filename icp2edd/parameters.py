@@ -128,6 +128,41 @@ def _check_param_attributes(dict_):
     return _
 
 
+def _check_param_traversal_depth(dict_=None):
+    """ """
+    if dict_ is None:
+        return {}
+    if not isinstance(dict_, dict):
+        _logger.error(
+            f"Invalid depth type -{dict_}-. depth must be a dictionary."
+            f"Check {setupcfg.extraParam}."
+        )
+        raise TypeError(f"Invalid depth type -{dict_}-")
+    for k, v in dict_.items():
+        if not isinstance(v, int) or isinstance(v, bool) or v < 0:
+            _logger.error(
+                f"Invalid depth -{v}- of path {k}. depth must be a positive integer."
+                f"Check {setupcfg.extraParam}."
+            )
+            raise ValueError(f"Invalid depth -{v}- of path {k}")
+    return dict_
+
+
+def _check_param_traversal(dict_):
+    """ """
+    if dict_ is None:
+        dict_ = {}
+
+    # default empty lists/dictionary: every path is followed
+    _ = {
+        "allow": [str(x) for x in _get_list(dict_.get("allow"))],
+        "deny": [str(x) for x in _get_list(dict_.get("deny"))],
+        "depth": _check_param_traversal_depth(dict_.get("depth")),
+    }
+
+    return _
+
+
 def _check_param(dict_):
     """
     check dictionary elements and reformat if need be
@@ -142,6 +177,11 @@ def _check_param(dict_):
     else:
         _["attributes"] = _check_param_attributes({})
 
+    if "traversal" in dict_:
+        _["traversal"] = _check_param_traversal(dict_["traversal"])
+    else:
+        _["traversal"] = _check_param_traversal({})
+
     return _
 
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pathRules.py
+
+"""
+    This module set up the rules pruning the exploration of ICOS CP metadata graph.
+
+    A predicate path is the list of attributes linking a DataObject (or a variable) to another
+    ICOS CP object, ex: ('station', 'responsible_organization').
+    Joined by the attributes' separator, it gives the prefix of the attributes of the linked object,
+    once flattened (see SuperICPObj.repack), ex: 'station_responsible_organization'.
+
+    Rules are read from parameters file (see parameters, 'traversal' section):
+    - allow: follow only paths matching one of those patterns, or leading to one of them
+    - deny: never follow paths matching one of those patterns
+    - depth: do not follow paths, matching pattern, longer than the given number of attributes
+    patterns are Unix shell-style wildcards (see fnmatch).
+
+    Without any rule, paths are not tracked (path is None), and every path is followed.
+
+    Example usage:
+
+    from icp2edd.pathRules import PathRules
+
+    rules = PathRules(allow=['station_*'], deny=['*_funding'], depth={'station_*': 3}, sep='_')
+    path = rules.extend(rules.root, 'station')  # ('station',)
+    rules.follow(path)                          # True
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import logging
+import re
+from fnmatch import fnmatchcase
+
+# import from other lib
+# import from my project
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# wildcard characters of fnmatch patterns
+_wildcard_re = re.compile(r"[*?\[]")
+
+
+# ----------------------------------------------
+class PathRules(object):
+    """
+    allow/deny rules, and maximum depth, of predicate paths
+
+    >>> rules = PathRules(allow=['station_responsible_organization_*'], deny=['*_funding'], sep='_')
+    >>> [rules.follow(_) for _ in [('station',), ('station', 'responsible_organization'), ('producer',)]]
+    [True, True, False]
+    >>> rules.follow(('station', 'responsible_organization', 'funding'))
+    False
+    >>> rules = PathRules(allow=['station_location'])
+    >>> [rules.follow(_) for _ in [('station',), ('station', 'location'), ('station', 'location', 'geometry')]]
+    [True, True, False]
+    >>> rules = PathRules(depth={'station_*': 2})
+    >>> [rules.follow(_) for _ in [('station', 'location'), ('station', 'location', 'geometry')]]
+    [True, False]
+    >>> PathRules().follow(None), PathRules().root, PathRules().extend(None, 'station')
+    (True, None, None)
+    """
+
+    def __init__(self, allow=None, deny=None, depth=None, sep="_"):
+        """initialise rules
+
+        :param allow: list of patterns of paths to follow [default every path]
+        :param deny: list of patterns of paths never followed
+        :param depth: maximum number of attributes of paths matching pattern {pattern: depth}
+        :param sep: separator between attributes of the path
+        """
+        self.allow = list(allow or [])
+        self.deny = list(deny or [])
+        self.depth = dict(depth or {})
+        self.sep = sep
+
+        # literal prefix of allowed patterns (None if no wildcard), see _leadsTo
+        self._prefix = [
+            _wildcard_re.split(_, maxsplit=1)[0] if _wildcard_re.search(_) else None
+            for _ in self.allow
+        ]
+        # decision by path
+        self._memo = {}
+
+    @property
+    def active(self):
+        """True if there is at least one rule"""
+        return bool(self.allow or self.deny or self.depth)
+
+    @property
+    def root(self):
+        """path of DataObject, or variable: None if paths are not tracked"""
+        return () if self.active else None
+
+    def extend(self, path_, key_):
+        """return path_ extended with attribute key_ (None if paths are not tracked)"""
+        return None if path_ is None else path_ + (key_,)
+
+    def follow(self, path_):
+        """return True if linked object at the end of path_ should be explored"""
+        if path_ is None:
+            return True
+        if path_ not in self._memo:
+            self._memo[path_] = self._follow(path_)
+        return self._memo[path_]
+
+    def _follow(self, path_):
+        """ """
+        name = self.sep.join(path_)
+        if any(fnmatchcase(name, _) for _ in self.deny):
+            return False
+        if any(len(path_) > n for _, n in self.depth.items() if fnmatchcase(name, _)):
+            return False
+        if not self.allow:
+            return True
+        return any(
+            fnmatchcase(name, pattern) or self._leadsTo(name, pattern, prefix)
+            for pattern, prefix in zip(self.allow, self._prefix)
+        )
+
+    def _leadsTo(self, name_, pattern_, prefix_):
+        """return True if a longer path, starting with name_, could match pattern_
+
+        :param prefix_: literal prefix of pattern_ (None if no wildcard)
+
+        Note: conservative, wildcards after the literal prefix are not checked
+        """
+        if prefix_ is None:
+            return pattern_.startswith(name_ + self.sep)
+        return prefix_.startswith(name_ + self.sep) or name_.startswith(prefix_)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# queryTrace.py
+
+"""
+    This module set up an opt-in trace of every SPARQL query sent by ICOS CP Objects.
+
+    For each query, are recorded:
+    - the class of the object, and the method which sent the query (getMeta, _getObject, ...)
+    - the query template (query text, with IRIs and literals replaced by placeholders),
+      and a hash of the values (IRIs and literals) filled in
+    - latency, HTTP status (None if read from cache), response size in bytes, and number of rows
+
+    Records are written to a JSONL file, and/or summarised at the end of the run
+    (slowest, and most repeated, queries).
+
+    Example usage:
+
+    import icp2edd.queryTrace as queryTrace
+
+    tracer = queryTrace.getTracer()     # None, if tracing is not set up
+    if tracer is not None:
+        tracer.record(...)
+    tracer.report(10)                   # print top 10 slowest, and most repeated, queries
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import atexit
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# import from other lib
+# import from my project
+import icp2edd.setupcfg as setupcfg
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# methods reported as calling site (see callSite)
+_methods = (
+    "getMeta",
+    "getMetaAsync",
+    "iterMeta",
+    "_getObject",
+    "getProperties",
+    "getPropertiesAsync",
+    "listUri",
+    "resolveTypes",
+)
+# IRI '<...>', or literal "..." '...'
+_values_re = re.compile(r"<[^<>\s]*>|\"[^\"]*\"|'[^']*'")
+# prefix declaration
+_prefix_re = re.compile(r"^\s*prefix\s+[\w-]*:\s*<[^>]*>\s*$", re.IGNORECASE | re.MULTILINE)
+
+# shared tracer
+_tracer = None
+_lock = threading.Lock()
+
+
+# ----------------------------------------------
+def _hash(str_):
+    """return short hash of string"""
+    return hashlib.sha1(str_.encode()).hexdigest()[:12]
+
+
+def split(query_):
+    """
+    split query in template, and values filled in
+
+    >>> split('prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\\nselect ?x where { VALUES ?x {<a:b> <c:d>} ?x rdf:type "y" }')
+    ('select ?x where { VALUES ?x {<> <>} ?x rdf:type "" }', ['<a:b>', '<c:d>', '"y"'])
+    """
+    query = " ".join(_prefix_re.sub("", query_).split())
+    values = _values_re.findall(query)
+    template = _values_re.sub(lambda m: m.group(0)[0] + m.group(0)[-1], query)
+    return template, values
+
+
+def callSite():
+    """return name of the first method, in the call stack, listed in _methods.
+
+    otherwise, name of the caller of ICPObj._query
+    """
+    frame = sys._getframe(1)
+    first = None
+    while frame is not None:
+        name = frame.f_code.co_name
+        if name in _methods:
+            return name
+        if first is None and name not in ("_query", "_queryAsync", "record", "_trace"):
+            first = name
+        frame = frame.f_back
+    return first
+
+
+class QueryTrace(object):
+    """ """
+
+    def __init__(self, path_=None):
+        """initialise query trace
+
+        :param path_: JSONL file where write records [default keep records in memory only]
+        """
+        self.path = None if path_ is None else Path(path_)
+        self.records = []
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a")
+
+    def record(self, klass_, method_, query_, latency_, info_=None, rows_=None, error_=None):
+        """record one query
+
+        :param klass_: class name of the object sending the query
+        :param method_: method sending the query
+        :param query_: query string
+        :param latency_: duration of the query, in seconds
+        :param info_: dictionary filled by the SPARQL client {'status', 'bytes', 'cached'}
+        :param rows_: number of rows
+        :param error_: error message, if query failed
+        """
+        info = info_ or {}
+        template, values = split(query_)
+        rec = {
+            "time": time.time(),
+            "class": klass_,
+            "method": method_,
+            "template": _hash(template),
+            "filters": _hash("\n".join(values)),
+            "latency": round(latency_, 6),
+            "status": info.get("status"),
+            "bytes": info.get("bytes"),
+            "cached": info.get("cached", False),
+            "rows": rows_,
+        }
+        if error_ is not None:
+            rec["error"] = error_
+
+        with self._lock:
+            self.records.append(rec)
+            if self._file is not None:
+                self._file.write(json.dumps(rec) + "\n")
+                self._file.flush()
+
+    def report(self, top_=10, print_=True):
+        """summarise records: top_ slowest, and most repeated, queries"""
+        with self._lock:
+            records = list(self.records)
+
+        lines = [
+            f"SPARQL queries: {len(records)}, "
+            f"total latency {sum(r['latency'] for r in records):.2f}s, "
+            f"{sum(1 for r in records if r['cached'])} read from cache"
+        ]
+
+        lines.append(f"top {top_} slowest queries:")
+        for r in sorted(records, key=lambda r: r["latency"], reverse=True)[:top_]:
+            lines.append(
+                f"\t{r['latency']:8.3f}s  {r['class']}.{r['method']}  "
+                f"template {r['template']}  filters {r['filters']}  "
+                f"rows {r['rows']}  bytes {r['bytes']}  status {r['status']}"
+            )
+
+        lines.append(f"top {top_} most repeated queries:")
+        repeat = Counter((r["class"], r["method"], r["template"], r["filters"]) for r in records)
+        for (klass, method, template, filters), n in repeat.most_common(top_):
+            if n < 2:
+                break
+            lines.append(f"\t{n:8d}x  {klass}.{method}  template {template}  filters {filters}")
+
+        _logger.info("\n".join(lines))
+        if print_:
+            print("\n" + "\n".join(lines))
+
+    def close(self):
+        """close trace file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# ----------------------------------------------
+def getTracer():
+    """return the process-wide query trace, create it if need be
+
+    return None if neither trace file, nor report, are set up (see setupcfg)
+    """
+    global _tracer
+
+    if _tracer is None:
+        path = getattr(setupcfg, "tracePath", None)
+        report = getattr(setupcfg, "traceReport", None)
+        if path is None and not report:
+            return None
+
+        with _lock:
+            if _tracer is None:
+                tracer = QueryTrace(path)
+                if report:
+                    # print summary at the end of the run
+                    atexit.register(tracer.report, report)
+                atexit.register(tracer.close)
+                _logger.debug(f"trace SPARQL queries in {path}")
+                _tracer = tracer
+    return _tracer
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
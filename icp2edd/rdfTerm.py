@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# rdfTerm.py
+
+"""
+    This module set up a compact, immutable, RDF term, used to store metadata read from ICOS CP.
+
+    Each term only holds its type, value, datatype, language tag, and object type (for uri).
+    URI, datatype and type strings are interned, so the same URI shared by thousands of records
+    is stored once.
+
+    Example usage:
+
+    from icp2edd.rdfTerm import Term
+
+    term = Term('uri', 'https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z')
+    term.value                          # 'https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z'
+    term = term.replace(objtype='cpmeta.DataObject')
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import logging
+import sys
+
+# import from other lib
+# import from my project
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------
+def _intern(str_):
+    """intern string, if any"""
+    return None if str_ is None else sys.intern(str_)
+
+
+class Term(object):
+    """
+    immutable and hashable RDF term
+
+    Note: equality and hash only depend on (type, value, datatype, lang),
+    object type is an annotation of the term (see ICPObj._groupby)
+
+    >>> t = Term('literal', 'Station X', lang='en')
+    >>> t
+    Term(literal:'Station X', lang='en')
+    >>> Term('typed-literal', '12.5', datatype='http://www.w3.org/2001/XMLSchema#double')
+    Term(typed-literal:'12.5', datatype='http://www.w3.org/2001/XMLSchema#double')
+    >>> t == Term('literal', 'Station X', lang='en'), t == Term('literal', 'Station X')
+    (True, False)
+    >>> t.value = 'Station Y'
+    Traceback (most recent call last):
+        ...
+    AttributeError: Term is immutable
+    >>> u = Term('uri', 'http://meta.icos-cp.eu/resources/stations/OS_X')
+    >>> u.replace(objtype='cpmeta.Station').objtype
+    'cpmeta.Station'
+    """
+
+    __slots__ = ("type", "value", "datatype", "lang", "objtype")
+
+    def __init__(self, type_, value_, datatype=None, lang=None, objtype=None):
+        """initialise RDF term
+
+        :param type_: type of the term ['uri','literal','typed-literal','bnode']
+        :param value_: value of the term
+        :param datatype: datatype URI of the literal
+        :param lang: language tag of the literal
+        :param objtype: object type name of the uri (ex: 'cpmeta.Station')
+        """
+        type_ = sys.intern(type_)
+        if type_ == "uri":
+            value_ = sys.intern(value_)
+        setattr_ = object.__setattr__
+        setattr_(self, "type", type_)
+        setattr_(self, "value", value_)
+        setattr_(self, "datatype", _intern(datatype))
+        setattr_(self, "lang", _intern(lang))
+        setattr_(self, "objtype", _intern(objtype))
+
+    def key(self):
+        """return (type, value, datatype, lang)"""
+        return self.type, self.value, self.datatype, self.lang
+
+    def replace(self, **kwargs):
+        """return new term, with some fields replaced"""
+        fields = {s: getattr(self, s) for s in self.__slots__}
+        fields.update(kwargs)
+        return Term(
+            fields["type"],
+            fields["value"],
+            datatype=fields["datatype"],
+            lang=fields["lang"],
+            objtype=fields["objtype"],
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Term is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Term is immutable")
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self.key() == other.key()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __reduce__(self):
+        return Term, (self.type, self.value, self.datatype, self.lang, self.objtype)
+
+    def __repr__(self):
+        extra = "".join(
+            ", %s=%r" % (k, getattr(self, k)) for k in ("datatype", "lang") if getattr(self, k) is not None
+        )
+        return "%s(%s:%r%s)" % (self.__class__.__name__, self.type, self.value, extra)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# refreshState.py
+
+"""
+    This module set up the state of the incremental refresh of ICOS CP metadata.
+
+    For each dataset (datasetID), are stored, from one run to the next:
+    - the DataObject uri, and a fingerprint of its own metadata (linked entity URIs, and values)
+    - its flattened attributes, and those of its variables (see SuperICPObj.repack)
+    - the uri reached while flattening them (station, organization, variables,...)
+    - the time they were built
+    and for each uri reached, its object type, and a fingerprint of its own metadata.
+
+    A DataObject whose fingerprint, and those of the uri it reaches, did not change since the last run,
+    is not explored again: its stored attributes are used instead.
+    Only uri of 'mutable' cache tier are fetched again to check their fingerprint (see SuperICPObj._changed),
+    so every DataObject is also explored again at least every 'maxage' days, or on forced full refresh.
+
+    Example usage:
+
+    import icp2edd.refreshState as refreshState
+
+    state = refreshState.getState()     # None, if incremental refresh is not set up
+    nodes = state.reached(datasetIds)   # {uri: [object type, fingerprint]} reached by stored datasets
+    entry = state.get(datasetId, uri, fingerprint(binding), changed)  # None, if need to be explored again
+    state.put(datasetId, uri, fingerprint(binding), attributes, variables, reached)
+    state.save()
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+# import from other lib
+# import from my project
+import icp2edd.setupcfg as setupcfg
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# default values
+_default_maxage = 7  # days
+
+# format of the state file
+_version = 2
+
+
+# ----------------------------------------------
+def fingerprint(binding_):
+    """
+    return fingerprint of metadata of one uri {variable: [Term, ...], ...}
+
+    independent of the order of the attributes, and of their values
+
+    >>> from icp2edd.rdfTerm import Term
+    >>> a = {'label': [Term('literal', 'x')], 'station': [Term('uri', 'http://s/1'), Term('uri', 'http://s/2')]}
+    >>> b = {'station': [Term('uri', 'http://s/2'), Term('uri', 'http://s/1')], 'label': [Term('literal', 'x')]}
+    >>> fingerprint(a) == fingerprint(b), fingerprint(a) == fingerprint({'label': [Term('literal', 'y')]})
+    (True, False)
+    """
+    items = sorted(
+        (k, sorted(tuple(str(x) for x in v.key()) for v in lv)) for k, lv in binding_.items()
+    )
+    return hashlib.sha1(json.dumps(items).encode()).hexdigest()
+
+
+class RefreshState(object):
+    """
+    stored attributes of datasets, from one run to the next
+
+    >>> import tempfile
+    >>> path = Path(tempfile.mkdtemp()) / 'state.json.gz'
+    >>> state = RefreshState(path)
+    >>> state.put('ds', 'http://d/1', 'fp', {'station_label': ['s']}, {}, {'http://s/1': ('cpmeta.Station', 'fps')})
+    >>> state.save()
+    >>> state = RefreshState(path)
+    >>> state.reached(['ds'])
+    {'http://s/1': ['cpmeta.Station', 'fps']}
+    >>> state.get('ds', 'http://d/1', 'fp')['attributes']
+    {'station_label': ['s']}
+    >>> state.get('ds', 'http://d/1', 'other'), state.get('ds', 'http://d/1', 'fp', {'http://s/1'})
+    (None, None)
+    >>> state.reused, state.explored
+    (1, 2)
+    """
+
+    def __init__(self, path_, maxage=None, full=False):
+        """initialise incremental refresh state, read it from file if any
+
+        :param path_: file where store the state (gzipped JSON)
+        :param maxage: maximum age of stored attributes, in days [default 7]
+        :param full: do not use stored attributes (forced full refresh) [True,False]
+        """
+        self.path = Path(path_)
+        self.maxage = _default_maxage if maxage is None else float(maxage)
+        self.full = bool(full)
+
+        self.datasets = {}
+        # uri reached by stored datasets {uri: [object type, fingerprint]}
+        self.nodes = {}
+        self.reused = 0
+        self.explored = 0
+        self._seen = set()
+        self.load()
+
+    def load(self):
+        """read state file, start from scratch if missing, or unreadable"""
+        if not self.path.is_file():
+            _logger.info(f"no incremental refresh state {self.path}, explore every DataObject")
+            return
+        try:
+            with gzip.open(self.path, "rb") as f:
+                data = json.loads(f.read().decode())
+        except (OSError, ValueError):
+            _logger.exception(f"can not read incremental refresh state {self.path}, ignore it")
+            return
+        if data.get("version") != _version:
+            _logger.warning(f"incompatible incremental refresh state {self.path}, ignore it")
+            return
+        self.datasets = data["datasets"]
+        self.nodes = data["nodes"]
+
+    def reached(self, datasetIds_):
+        """return uri reached by stored datasetIds_ {uri: [object type, fingerprint]}, none on forced full refresh"""
+        if self.full:
+            return {}
+        return {
+            uri: self.nodes[uri]
+            for datasetId in datasetIds_
+            for uri in self.datasets.get(datasetId, {}).get("reached", [])
+            if uri in self.nodes
+        }
+
+    def get(self, datasetId_, uri_, fingerprint_, changed_=frozenset()):
+        """
+        return stored entry of datasetId_ {'attributes': ..., 'variables': ...}
+
+        None if there is no entry, or if it is outdated (other uri, other fingerprint, too old,
+        reaching uri changed since last run), or on forced full refresh
+
+        :param changed_: set of uri whose fingerprint changed since last run
+        """
+        self._seen.add(datasetId_)
+        entry = self.datasets.get(datasetId_)
+        if (
+            self.full
+            or entry is None
+            or entry["uri"] != uri_
+            or entry["fingerprint"] != fingerprint_
+            or time.time() - entry["time"] > self.maxage * 86400
+            or not changed_.isdisjoint(entry["reached"])
+        ):
+            self.explored += 1
+            return None
+        self.reused += 1
+        return entry
+
+    def put(self, datasetId_, uri_, fingerprint_, attributes_, variables_, reached_=None):
+        """store entry of datasetId_
+
+        :param attributes_: flattened attributes of the DataObject {attribute: [value, ...], ...}
+        :param variables_: flattened attributes of its variables {variableId: {attribute: [value, ...], ...}, ...}
+        :param reached_: uri reached while flattening them {uri: (object type, fingerprint)}
+        """
+        reached = reached_ or {}
+        self._seen.add(datasetId_)
+        self.datasets[datasetId_] = {
+            "uri": uri_,
+            "fingerprint": fingerprint_,
+            "time": time.time(),
+            "attributes": attributes_,
+            "variables": variables_,
+            "reached": sorted(reached),
+        }
+        self.nodes.update({uri: list(node) for uri, node in reached.items()})
+
+    def save(self):
+        """write state file, without datasets not seen during the run, nor uri not reached by those kept"""
+        self.datasets = {k: v for k, v in self.datasets.items() if k in self._seen}
+        reached = {uri for v in self.datasets.values() for uri in v["reached"]}
+        self.nodes = {k: v for k, v in self.nodes.items() if k in reached}
+        data = {"version": _version, "datasets": self.datasets, "nodes": self.nodes}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp, "wb") as f:
+            f.write(json.dumps(data).encode())
+        os.replace(tmp, self.path)
+        _logger.info(
+            f"incremental refresh: {self.reused} DataObject reused, {self.explored} explored, "
+            f"state saved in {self.path}"
+        )
+
+
+# ----------------------------------------------
+def getState():
+    """return incremental refresh state, read from file
+
+    return None if incremental refresh is not set up (see setupcfg)
+    """
+    if not getattr(setupcfg, "refreshIncremental", False):
+        return None
+
+    return RefreshState(
+        setupcfg.refreshPath,
+        maxage=getattr(setupcfg, "refreshMaxAge", None),
+        full=getattr(setupcfg, "refreshFull", False),
+    )
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
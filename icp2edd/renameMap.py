@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# renameMap.py
+
+"""
+    This module set up the map renaming ICOS CP attributes, compiled from the 'convert' rules
+    of parameters file (see parameters, 'attributes' section).
+
+    Rules are applied in the order of the parameters file, each one to the name output by the previous ones:
+    - 'origin_name': exact attribute name
+    - '*suffix': any attribute name equal to 'suffix', or ending with separator + 'suffix',
+      ex: '*type_units' matches 'specification_type_units', not 'datatype_units'
+      ('*_suffix' is the same as '*suffix')
+    - 'prefix*': any attribute name starting with 'prefix'
+    the matching attribute name is replaced by the target name.
+
+    The new name of each attribute name is computed once, and read from memo afterwards.
+
+    Example usage:
+
+    from icp2edd.renameMap import RenameMap
+
+    rename = RenameMap({'type_units': 'units', '*_exact_match': 'license'}, sep='_')
+    rename('type_units')                # 'units'
+    rename('label')                     # 'label'
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import logging
+
+# import from other lib
+# import from my project
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------
+class RenameMap(object):
+    """
+    compiled map renaming attribute names
+
+    >>> rename = RenameMap({'type_units': 'units', 'units': 'unit', '*_exact_match': 'license', 'sta*': 'station'})
+    >>> [rename(_) for _ in ['type_units', 'units', 'license_exact_match', 'stamp', 'label']]
+    ['unit', 'unit', 'license', 'station', 'label']
+    >>> rename = RenameMap({'*type_units': 'units', '*_exact_match': 'license'})
+    >>> [rename(_) for _ in ['type_units', 'specification_type_units', 'datatype_units', 'exact_match']]
+    ['units', 'units', 'datatype_units', 'license']
+    """
+
+    def __init__(self, convert_=None, sep="_"):
+        """compile rules {origin_name: target_name}
+
+        :param convert_: dictionary of rules, origin name could start, or end, with '*'
+        :param sep: separator between attributes in attribute names (see parameters, 'sep')
+        """
+        self.sep = sep
+        # rules (kind, pattern, target), kind in ['exact','suffix','prefix']
+        self.rules = []
+        for old, new in (convert_ or {}).items():
+            old = str(old)
+            if old.startswith("*"):
+                # suffix matches on separator boundary, with or without leading separator
+                suffix = old[1:]
+                if sep and suffix.startswith(sep):
+                    suffix = suffix[len(sep) :]
+                self.rules.append(("suffix", suffix, new))
+            elif old.endswith("*"):
+                self.rules.append(("prefix", old[:-1], new))
+            else:
+                self.rules.append(("exact", old, new))
+        # new name by attribute name
+        self._memo = {}
+
+    def __call__(self, name_):
+        """return new name of attribute name_ (itself if no rule match)"""
+        try:
+            return self._memo[name_]
+        except KeyError:
+            pass
+
+        name = name_
+        for kind, pattern, target in self.rules:
+            if (
+                (kind == "exact" and name == pattern)
+                or (kind == "suffix" and (name == pattern or name.endswith(self.sep + pattern)))
+                or (kind == "prefix" and name.startswith(pattern))
+            ):
+                name = target
+        self._memo[name_] = name
+        return name
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -29,7 +29,7 @@ from icp2edd.icpobj import *
 
 # --- module's variable ------------------------
 # public
-global erddapPath, erddapWebInfDir, erddapContentDir, datasetXmlPath, datasetCsvPath, icp2eddPath, logPath, log_filename, submFrom, submUntil, product, lastversion, authorised_product, extraParam, downloadOnto, writeOnto, allowed_objects
+global erddapPath, erddapWebInfDir, erddapContentDir, datasetXmlPath, datasetCsvPath, icp2eddPath, logPath, log_filename, submFrom, submUntil, product, lastversion, authorised_product, extraParam, downloadOnto, writeOnto, allowed_objects, sparqlEndpoint, sparqlPoolSize, sparqlTimeout, sparqlPageSize, sparqlStrategy, sparqlConcurrency, sparqlMaxGet, sparqlBudget, sparqlMetaBudget, sparqlBackend, sparqlDump, cachePath, cacheTtl, cacheSize, cacheDisable, cacheRefresh, cacheTierTtl, cacheTier, tracePath, traceReport, fixturePath, fixtureMode, fixtureLatency, metaWorkers, metaDepth, refreshPath, refreshIncremental, refreshMaxAge, refreshFull
 # private
 global _config, _cfg_path, _update_log, _logcfg, _warning_handler, _error_handler, _fatal_handler, _checkOnto
 
@@ -258,6 +258,332 @@ def _chk_config_onto(cfg_):
         # do not raise other exception as it will be by calling function
 
 
+def _chk_config_sparql(cfg_):
+    """ """
+    global sparqlEndpoint, sparqlPoolSize, sparqlTimeout, sparqlPageSize, sparqlStrategy, sparqlConcurrency
+    global sparqlMaxGet, sparqlBudget, sparqlMetaBudget, sparqlBackend, sparqlDump
+
+    # SPARQL backend
+    try:
+        sparqlBackend = cfg_["sparql"]["backend"].get()
+        if sparqlBackend is None:
+            sparqlBackend = "remote"
+        if sparqlBackend not in ("remote", "local"):
+            raise ValueError(
+                f"Invalid sparql backend -{sparqlBackend}-, must be 'remote' or 'local'"
+            )
+    except confuse.exceptions.NotFoundError:
+        sparqlBackend = "remote"
+        # do not raise other exception as it will be by calling function
+
+    # RDF dump file(s) loaded by local backend
+    try:
+        _ = cfg_["sparql"]["dump"].get()
+        if _ is None:
+            sparqlDump = []
+        elif isinstance(_, list):
+            sparqlDump = [Path(str(x)).expanduser() for x in _]
+        else:
+            sparqlDump = [Path(str(_)).expanduser()]
+        for path in sparqlDump:
+            if sparqlBackend == "local" and not path.is_file():
+                raise FileNotFoundError(f"Can not find RDF dump file -{path}-")
+    except confuse.exceptions.NotFoundError:
+        sparqlDump = []
+        # do not raise other exception as it will be by calling function
+
+    # SPARQL endpoint
+    try:
+        sparqlEndpoint = cfg_["sparql"]["endpoint"].get(str)
+    except confuse.exceptions.NotFoundError:
+        sparqlEndpoint = None
+        # do not raise other exception as it will be by calling function
+
+    # number of connections kept alive
+    try:
+        sparqlPoolSize = cfg_["sparql"]["poolsize"].get(int)
+    except confuse.exceptions.NotFoundError:
+        sparqlPoolSize = None
+        # do not raise other exception as it will be by calling function
+
+    # request timeout
+    try:
+        sparqlTimeout = cfg_["sparql"]["timeout"].get(int)
+    except confuse.exceptions.NotFoundError:
+        sparqlTimeout = None
+        # do not raise other exception as it will be by calling function
+
+    # number of rows by page, when loading DataObject metadata
+    try:
+        sparqlPageSize = cfg_["sparql"]["pagesize"].get()
+        if sparqlPageSize is not None:
+            sparqlPageSize = int(sparqlPageSize)
+    except confuse.exceptions.NotFoundError:
+        sparqlPageSize = None
+        # do not raise other exception as it will be by calling function
+
+    # number of queries run at once, when harvesting metadata
+    try:
+        sparqlConcurrency = cfg_["sparql"]["concurrency"].get(int)
+        if sparqlConcurrency < 1:
+            raise ValueError(f"Invalid sparql concurrency -{sparqlConcurrency}-, must be >= 1")
+    except confuse.exceptions.NotFoundError:
+        sparqlConcurrency = None
+        # do not raise other exception as it will be by calling function
+
+    # maximum size of query sent with HTTP GET (POST otherwise)
+    try:
+        sparqlMaxGet = cfg_["sparql"]["maxget"].get(int)
+    except confuse.exceptions.NotFoundError:
+        sparqlMaxGet = None
+        # do not raise other exception as it will be by calling function
+
+    # maximum size of list inlined in a query
+    try:
+        sparqlBudget = cfg_["sparql"]["budget"].get(int)
+    except confuse.exceptions.NotFoundError:
+        sparqlBudget = None
+        # do not raise other exception as it will be by calling function
+
+    # maximum size of list of uri inlined in a metadata query
+    try:
+        sparqlMetaBudget = cfg_["sparql"]["metabudget"].get(int)
+        if sparqlMetaBudget < 1:
+            raise ValueError(f"Invalid sparql metabudget -{sparqlMetaBudget}-, must be >= 1")
+    except confuse.exceptions.NotFoundError:
+        sparqlMetaBudget = None
+        # do not raise other exception as it will be by calling function
+
+    # query strategy by class name {class name: strategy}, see ICPObj._compile
+    try:
+        sparqlStrategy = cfg_["sparql"]["strategy"].get()
+        if sparqlStrategy is None:
+            sparqlStrategy = {}
+        if not isinstance(sparqlStrategy, dict):
+            raise TypeError(f"Invalid sparql strategy -{sparqlStrategy}-, must be dictionary")
+        for k, v in sparqlStrategy.items():
+            if v not in ("optional", "pivot"):
+                raise ValueError(
+                    f"Invalid sparql strategy -{v}- for class {k}, must be 'optional' or 'pivot'"
+                )
+    except confuse.exceptions.NotFoundError:
+        sparqlStrategy = {}
+        # do not raise other exception as it will be by calling function
+
+
+def _chk_config_cache(cfg_):
+    """ """
+    global cachePath, cacheTtl, cacheSize, cacheDisable, cacheRefresh, cacheTierTtl, cacheTier
+
+    # SQLite file where store SPARQL responses
+    try:
+        _ = cfg_["cache"]["path"].get()
+        if _ is not None:
+            cachePath = Path(str(_)).expanduser()
+        else:
+            # ~/.config/<package> directory
+            cachePath = Path(cfg_.config_dir()) / "sparql_cache.sqlite"
+    except confuse.exceptions.NotFoundError:
+        cachePath = Path(cfg_.config_dir()) / "sparql_cache.sqlite"
+
+    # time to live of cached responses
+    try:
+        cacheTtl = cfg_["cache"]["ttl"].get(int)
+    except confuse.exceptions.NotFoundError:
+        cacheTtl = None
+        # do not raise other exception as it will be by calling function
+
+    # maximum size of the cache
+    try:
+        cacheSize = cfg_["cache"]["size"].get(int)
+    except confuse.exceptions.NotFoundError:
+        cacheSize = None
+        # do not raise other exception as it will be by calling function
+
+    # do not use cache
+    try:
+        cacheDisable = cfg_["cache"]["disable"].get(bool)
+    except confuse.exceptions.NotFoundError:
+        cacheDisable = False
+        # do not raise other exception as it will be by calling function
+
+    # do not read from cache, but refresh it
+    try:
+        cacheRefresh = cfg_["cache"]["refresh"].get(bool)
+    except confuse.exceptions.NotFoundError:
+        cacheRefresh = False
+        # do not raise other exception as it will be by calling function
+
+    # time to live of cached metadata, by cache tier {tier: ttl}, see ICPObj._cacheTtl
+    try:
+        cacheTierTtl = cfg_["cache"]["tiers"].get()
+        if cacheTierTtl is None:
+            cacheTierTtl = {}
+        if not isinstance(cacheTierTtl, dict):
+            raise TypeError(f"Invalid cache tiers -{cacheTierTtl}-, must be dictionary")
+        for k, v in cacheTierTtl.items():
+            if k not in ("static", "ontology", "mutable"):
+                raise ValueError(
+                    f"Invalid cache tier -{k}-, must be 'static', 'ontology' or 'mutable'"
+                )
+            if v is not None and not isinstance(v, int):
+                raise TypeError(f"Invalid time to live -{v}- of cache tier {k}, must be integer")
+    except confuse.exceptions.NotFoundError:
+        cacheTierTtl = {}
+        # do not raise other exception as it will be by calling function
+
+    # cache tier by class name {class name: tier}, see ICPObj._cacheTier
+    try:
+        cacheTier = cfg_["cache"]["classes"].get()
+        if cacheTier is None:
+            cacheTier = {}
+        if not isinstance(cacheTier, dict):
+            raise TypeError(f"Invalid cache classes -{cacheTier}-, must be dictionary")
+        for k, v in cacheTier.items():
+            if v not in ("static", "ontology", "mutable"):
+                raise ValueError(
+                    f"Invalid cache tier -{v}- for class {k}, must be 'static', 'ontology' or 'mutable'"
+                )
+    except confuse.exceptions.NotFoundError:
+        cacheTier = {}
+        # do not raise other exception as it will be by calling function
+
+
+def _chk_config_trace(cfg_):
+    """ """
+    global tracePath, traceReport
+
+    # JSONL file where record every SPARQL query
+    try:
+        _ = cfg_["trace"]["path"].get()
+        tracePath = None if _ is None else Path(str(_)).expanduser()
+    except confuse.exceptions.NotFoundError:
+        tracePath = None
+        # do not raise other exception as it will be by calling function
+
+    # number of slowest, and most repeated, queries printed at the end of the run
+    try:
+        traceReport = cfg_["trace"]["report"].get()
+        if traceReport is not None:
+            traceReport = int(traceReport)
+    except confuse.exceptions.NotFoundError:
+        traceReport = None
+        # do not raise other exception as it will be by calling function
+
+
+def _chk_config_fixture(cfg_):
+    """ """
+    global fixturePath, fixtureMode, fixtureLatency
+
+    # directory where record, or from where replay, ICOS CP responses
+    try:
+        _ = cfg_["fixture"]["path"].get()
+        fixturePath = None if _ is None else Path(str(_)).expanduser()
+    except confuse.exceptions.NotFoundError:
+        fixturePath = None
+        # do not raise other exception as it will be by calling function
+
+    # record or replay ICOS CP responses
+    try:
+        fixtureMode = cfg_["fixture"]["mode"].get()
+    except confuse.exceptions.NotFoundError:
+        fixtureMode = None
+        # do not raise other exception as it will be by calling function
+
+    # inline arguments '--record DIR', '--replay DIR' set both mode and directory
+    for mode in ("record", "replay"):
+        try:
+            _ = cfg_["fixture"][mode].get()
+        except confuse.exceptions.NotFoundError:
+            _ = None
+        if _ is not None:
+            fixtureMode = mode
+            fixturePath = Path(str(_)).expanduser()
+
+    if fixtureMode is not None:
+        if fixtureMode not in ("record", "replay"):
+            raise ValueError(
+                f"Invalid fixture mode {fixtureMode}, must be one of ['record', 'replay']"
+            )
+        if fixturePath is None:
+            raise ValueError(f"fixture mode {fixtureMode} requires fixture directory 'fixture.path'")
+        if fixtureMode == "replay" and not fixturePath.is_dir():
+            raise FileNotFoundError(f"Can not find fixture directory {fixturePath}")
+
+    # artificial latency added to each replayed response, in seconds
+    try:
+        fixtureLatency = cfg_["fixture"]["latency"].get()
+        fixtureLatency = 0.0 if fixtureLatency is None else float(fixtureLatency)
+    except confuse.exceptions.NotFoundError:
+        fixtureLatency = 0.0
+        # do not raise other exception as it will be by calling function
+
+
+def _chk_config_meta(cfg_):
+    """ """
+    global metaWorkers, metaDepth
+
+    # number of threads exploring the metadata graph
+    try:
+        metaWorkers = cfg_["meta"]["workers"].get()
+        metaWorkers = 1 if metaWorkers is None else int(metaWorkers)
+    except confuse.exceptions.NotFoundError:
+        metaWorkers = 1
+        # do not raise other exception as it will be by calling function
+    if metaWorkers < 1:
+        raise ValueError(f"Invalid number of workers -{metaWorkers}-, must be >= 1")
+
+    # maximum depth of the metadata graph explored from DataObject
+    try:
+        metaDepth = cfg_["meta"]["depth"].get()
+        if metaDepth is not None:
+            metaDepth = int(metaDepth)
+    except confuse.exceptions.NotFoundError:
+        metaDepth = None
+        # do not raise other exception as it will be by calling function
+    if metaDepth is not None and metaDepth < 0:
+        raise ValueError(f"Invalid maximum depth -{metaDepth}-, must be >= 0")
+
+
+def _chk_config_refresh(cfg_):
+    """ """
+    global refreshPath, refreshIncremental, refreshMaxAge, refreshFull
+
+    # file where store flattened metadata of each dataset, and its fingerprint
+    try:
+        _ = cfg_["refresh"]["path"].get()
+        if _ is not None:
+            refreshPath = Path(str(_)).expanduser()
+        else:
+            # ~/.config/<package> directory
+            refreshPath = Path(cfg_.config_dir()) / "refresh_state.json.gz"
+    except confuse.exceptions.NotFoundError:
+        refreshPath = Path(cfg_.config_dir()) / "refresh_state.json.gz"
+
+    # only explore DataObject whose fingerprint changed since last run
+    try:
+        refreshIncremental = bool(cfg_["refresh"]["incremental"].get())
+    except confuse.exceptions.NotFoundError:
+        refreshIncremental = False
+        # do not raise other exception as it will be by calling function
+
+    # explore every DataObject at least every 'maxage' days
+    try:
+        refreshMaxAge = cfg_["refresh"]["maxage"].get()
+        if refreshMaxAge is not None:
+            refreshMaxAge = float(refreshMaxAge)
+    except confuse.exceptions.NotFoundError:
+        refreshMaxAge = None
+        # do not raise other exception as it will be by calling function
+
+    # forced full refresh
+    try:
+        refreshFull = bool(cfg_["refresh"]["full"].get())
+    except confuse.exceptions.NotFoundError:
+        refreshFull = False
+        # do not raise other exception as it will be by calling function
+
+
 def _chk_config_extra(cfg_):
     """ """
     global extraParam
@@ -390,6 +716,18 @@ def _chk_config(cfg_):
         _chk_config_authorised(cfg_)
         # check ontology parameters from configuration file(s)
         _chk_config_onto(cfg_)
+        # check sparql parameters from configuration file(s)
+        _chk_config_sparql(cfg_)
+        # check cache parameters from configuration file(s)
+        _chk_config_cache(cfg_)
+        # check trace parameters from configuration file(s)
+        _chk_config_trace(cfg_)
+        # check record/replay parameters from configuration file(s)
+        _chk_config_fixture(cfg_)
+        # check metadata exploration parameters from configuration file(s)
+        _chk_config_meta(cfg_)
+        # check incremental refresh parameters from configuration file(s)
+        _chk_config_refresh(cfg_)
         # check update parameters from configuration file(s)
         _chk_config_extra(cfg_)
         # check product parameters from configuration file(s)
@@ -633,6 +971,83 @@ def _parse():
             help="download rdf ontology file from ICOS CP",
             dest="onto.download",
         )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not use cache of SPARQL responses",
+        dest="cache.disable",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="do not read SPARQL responses from cache, but refresh them",
+        dest="cache.refresh",
+    )
+    parser.add_argument(
+        "--query-trace",
+        type=str,
+        help="record every SPARQL query (latency, rows, bytes,...) in this JSONL file",
+        metavar="FILE",
+        dest="trace.path",
+    )
+    parser.add_argument(
+        "--query-report",
+        type=int,
+        nargs="?",
+        const=10,
+        help="print the N (default 10) slowest, and most repeated, SPARQL queries at the end of the run",
+        metavar="N",
+        dest="trace.report",
+    )
+    parser.add_argument(
+        "--record",
+        type=str,
+        help="record SPARQL responses, and downloaded files, in this directory",
+        metavar="DIR",
+        dest="fixture.record",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="replay SPARQL responses, and downloaded files, recorded in this directory (see --record)",
+        metavar="DIR",
+        dest="fixture.replay",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        help="artificial latency added to each replayed response, in seconds",
+        metavar="SEC",
+        dest="fixture.latency",
+    )
+    parser.add_argument(
+        "--meta-workers",
+        type=int,
+        help="number of threads exploring the metadata graph in parallel",
+        metavar="N",
+        dest="meta.workers",
+    )
+    parser.add_argument(
+        "--meta-depth",
+        type=int,
+        help="maximum depth of the metadata graph explored from DataObject",
+        metavar="N",
+        dest="meta.depth",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_const",
+        const=True,
+        help="only explore metadata of DataObject changed since last run",
+        dest="refresh.incremental",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_const",
+        const=True,
+        help="explore metadata of every DataObject, even unchanged since last run (see --incremental)",
+        dest="refresh.full",
+    )
     #
     parser.add_argument(
         "--arguments",
@@ -757,6 +1172,41 @@ def _show_arguments(cfg_, print_=False):
     logging.debug(f"log.verbose         : {cfg_['log']['verbose']}  ")
     logging.debug(f"log.level           : {cfg_['log']['level']}\n")
 
+    logging.debug(f"sparql.backend      : {sparqlBackend}")
+    logging.debug(f"sparql.dump         : {sparqlDump}")
+    logging.debug(f"sparql.endpoint     : {sparqlEndpoint}")
+    logging.debug(f"sparql.poolsize     : {sparqlPoolSize}")
+    logging.debug(f"sparql.timeout      : {sparqlTimeout}")
+    logging.debug(f"sparql.pagesize     : {sparqlPageSize}")
+    logging.debug(f"sparql.strategy     : {sparqlStrategy}")
+    logging.debug(f"sparql.concurrency  : {sparqlConcurrency}")
+    logging.debug(f"sparql.maxget       : {sparqlMaxGet}")
+    logging.debug(f"sparql.budget       : {sparqlBudget}")
+    logging.debug(f"sparql.metabudget   : {sparqlMetaBudget}\n")
+
+    logging.debug(f"cache.path          : {cachePath}")
+    logging.debug(f"cache.ttl           : {cacheTtl}")
+    logging.debug(f"cache.size          : {cacheSize}")
+    logging.debug(f"cache.disable       : {cacheDisable}")
+    logging.debug(f"cache.tiers         : {cacheTierTtl}")
+    logging.debug(f"cache.classes       : {cacheTier}")
+    logging.debug(f"cache.refresh       : {cacheRefresh}\n")
+
+    logging.debug(f"trace.path          : {tracePath}")
+    logging.debug(f"trace.report        : {traceReport}\n")
+
+    logging.debug(f"fixture.path        : {fixturePath}")
+    logging.debug(f"fixture.mode        : {fixtureMode}")
+    logging.debug(f"fixture.latency     : {fixtureLatency}\n")
+
+    logging.debug(f"meta.workers        : {metaWorkers}")
+    logging.debug(f"meta.depth          : {metaDepth}\n")
+
+    logging.debug(f"refresh.path        : {refreshPath}")
+    logging.debug(f"refresh.incremental : {refreshIncremental}")
+    logging.debug(f"refresh.maxage      : {refreshMaxAge}")
+    logging.debug(f"refresh.full        : {refreshFull}\n")
+
     if not _checkOnto:
         logging.debug(f"authorised.product  : {authorised_product}\n")
 
@@ -789,6 +1239,41 @@ def _show_arguments(cfg_, print_=False):
         print(f"log.verbose         : {cfg_['log']['verbose']}  ")
         print(f"log.level           : {cfg_['log']['level']}\n")
 
+        print(f"sparql.backend      : {sparqlBackend}")
+        print(f"sparql.dump         : {sparqlDump}")
+        print(f"sparql.endpoint     : {sparqlEndpoint}")
+        print(f"sparql.poolsize     : {sparqlPoolSize}")
+        print(f"sparql.timeout      : {sparqlTimeout}")
+        print(f"sparql.pagesize     : {sparqlPageSize}")
+        print(f"sparql.strategy     : {sparqlStrategy}")
+        print(f"sparql.concurrency  : {sparqlConcurrency}")
+        print(f"sparql.maxget       : {sparqlMaxGet}")
+        print(f"sparql.budget       : {sparqlBudget}")
+        print(f"sparql.metabudget   : {sparqlMetaBudget}\n")
+
+        print(f"cache.path          : {cachePath}")
+        print(f"cache.ttl           : {cacheTtl}")
+        print(f"cache.size          : {cacheSize}")
+        print(f"cache.disable       : {cacheDisable}")
+        print(f"cache.tiers         : {cacheTierTtl}")
+        print(f"cache.classes       : {cacheTier}")
+        print(f"cache.refresh       : {cacheRefresh}\n")
+
+        print(f"trace.path          : {tracePath}")
+        print(f"trace.report        : {traceReport}\n")
+
+        print(f"fixture.path        : {fixturePath}")
+        print(f"fixture.mode        : {fixtureMode}")
+        print(f"fixture.latency     : {fixtureLatency}\n")
+
+        print(f"meta.workers        : {metaWorkers}")
+        print(f"meta.depth          : {metaDepth}\n")
+
+        print(f"refresh.path        : {refreshPath}")
+        print(f"refresh.incremental : {refreshIncremental}")
+        print(f"refresh.maxage      : {refreshMaxAge}")
+        print(f"refresh.full        : {refreshFull}\n")
+
         if not _checkOnto:
             print(f"authorised.product  : {authorised_product}\n")
 
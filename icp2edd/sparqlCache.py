@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# sparqlCache.py
+
+"""
+    This module set up a persistent, on-disk, cache of SPARQL responses.
+
+    Responses are stored in a local SQLite file, keyed by the normalised query text
+    (prefix block stripped, white spaces collapsed, but inside string literals).
+    Each entry has its own time to live, and the least recently used entries are evicted
+    when the cache exceeds its size limit.
+
+    Example usage:
+
+    from icp2edd.sparqlCache import SparqlCache
+
+    cache = SparqlCache('/path/to/sparql_cache.sqlite')
+    res = cache.get(query)          # None if not cached, or expired
+    cache.put(query, res)           # store SPARQL JSON result
+    cache.stats()                   # hit/miss statistics
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# import from other lib
+# import from my project
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# default values
+_default_ttl = 86400  # 1 day
+_default_size = 512  # MB
+
+# prefix declaration at the beginning of a query
+_prefix_re = re.compile(r"^\s*prefix\s+[\w-]*:\s*<[^>]*>\s*$", re.IGNORECASE | re.MULTILINE)
+# string literal (long, or short, quoted) kept as is, or white spaces collapsed, see normalise
+_space_re = re.compile(
+    r'("""(?:[^"\\]|\\.|"(?!""))*"""'
+    r"|'''(?:[^'\\]|\\.|'(?!''))*'''"
+    r'|"(?:[^"\\\n]|\\.)*"'
+    r"|'(?:[^'\\\n]|\\.)*')"
+    r"|\s+",
+    re.DOTALL,
+)
+
+
+# ----------------------------------------------
+def normalise(query_):
+    """
+    normalise query text, used as cache key
+
+    - drop prefix block
+    - collapse white spaces, but inside string literals
+
+    >>> normalise('prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\\nselect ?x\\n  where { ?x  a ?y }')
+    'select ?x where { ?x a ?y }'
+    >>> normalise('select ?x\\n where { VALUES ?name { "a  b.csv"  "c\\\\"  d" } }  ')
+    'select ?x where { VALUES ?name { "a  b.csv" "c\\\\"  d" } }'
+    """
+    return _space_re.sub(lambda m: m.group(1) or " ", _prefix_re.sub("", query_)).strip()
+
+
+class SparqlCache(object):
+    """ """
+
+    def __init__(self, path_, ttl=None, size=None):
+        """initialise SPARQL response cache
+
+        :param path_: SQLite file where store responses
+        :param ttl: default time to live of an entry, in seconds [default 1 day]
+        :param size: maximum size of the cache, in MB [default 512]
+        """
+        self.path = Path(path_)
+        self.ttl = _default_ttl if ttl is None else int(ttl)
+        self.maxsize = int((_default_size if size is None else size) * 1024 ** 2)
+
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # connection shared between threads, access serialised with a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response ("
+            " key TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires REAL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS response_accessed ON response (accessed)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(query_):
+        """return hash of the normalised query"""
+        return hashlib.sha256(normalise(query_).encode()).hexdigest()
+
+    def get(self, query_):
+        """return cached SPARQL JSON result of the query, None if not cached or expired"""
+        key = self._key(query_)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, expires FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            data, expires = row
+            if expires is not None and expires < now:
+                # expired
+                self._db.execute("DELETE FROM response WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE response SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(data))
+
+    def put(self, query_, json_, ttl=None):
+        """store SPARQL JSON result of the query
+
+        :param ttl: time to live of this entry, in seconds.
+            negative value: never expire; None: use default time to live
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = None if ttl < 0 else now + ttl
+
+        data = zlib.compress(json.dumps(json_).encode())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO response (key, data, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self._key(query_), data, len(data), expires, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def getMany(self, queries_):
+        """return {query: cached SPARQL JSON result} of queries_ cached, and not expired (see get)"""
+        keys = {self._key(q): q for q in queries_}
+        now = time.time()
+        out = {}
+        with self._lock:
+            for key, query in keys.items():
+                row = self._db.execute(
+                    "SELECT data, expires FROM response WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or (row[1] is not None and row[1] < now):
+                    self.misses += 1
+                    continue
+                out[query] = row[0]
+                self.hits += 1
+            self._db.executemany(
+                "UPDATE response SET accessed = ? WHERE key = ?",
+                [(now, self._key(q)) for q in out],
+            )
+            self._db.commit()
+
+        return {q: json.loads(zlib.decompress(data)) for q, data in out.items()}
+
+    def putMany(self, items_, ttl=None):
+        """store SPARQL JSON results {query: json}, in a single transaction (see put)"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = None if ttl < 0 else now + ttl
+
+        rows = []
+        for query, json_ in items_.items():
+            data = zlib.compress(json.dumps(json_).encode())
+            rows.append((self._key(query), data, len(data), expires, now))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO response (key, data, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """drop expired, then least recently used, entries until cache fit its size limit"""
+        self._db.execute(
+            "DELETE FROM response WHERE expires IS NOT NULL AND expires < ?",
+            (time.time(),),
+        )
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response"
+        ).fetchone()
+        if total <= self.maxsize:
+            return
+
+        drop = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM response ORDER BY accessed"
+        ):
+            if total <= self.maxsize:
+                break
+            drop.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM response WHERE key = ?", drop)
+        _logger.debug(f"evict {len(drop)} entries from SPARQL cache")
+
+    def clear(self):
+        """drop every entries"""
+        with self._lock:
+            self._db.execute("DELETE FROM response")
+            self._db.commit()
+
+    def stats(self):
+        """return cache statistics"""
+        with self._lock:
+            (entries, total) = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def logStats(self):
+        """log cache statistics"""
+        _ = self.stats()
+        calls = _["hits"] + _["misses"]
+        ratio = 100.0 * _["hits"] / calls if calls else 0.0
+        _logger.info(
+            f"SPARQL cache: {_['hits']} hits, {_['misses']} misses ({ratio:.1f}% hit), "
+            f"{_['entries']} entries, {_['bytes'] / 1024 ** 2:.1f} MB on {self.path}"
+        )
+
+    def close(self):
+        """close SQLite connection"""
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
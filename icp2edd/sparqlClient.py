@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# sparqlClient.py
+
+"""
+    This module set up a process-wide SPARQL client, shared by every ICOS CP Object.
+
+    The client keeps one HTTP session open (keep-alive, pool of connections, gzip encoding),
+    so that the thousands of queries sent during a run reuse a handful of connections,
+    instead of opening a new one per query.
+    Optionally, responses are stored in a persistent cache (see sparqlCache),
+    to avoid asking ICOS CP the same question run after run.
+
+    Large queries (ex: long VALUES list) are sent with HTTP POST, instead of GET,
+    to avoid too large Request-URI.
+
+    Instead of ICOS CP endpoint, queries could be run against a local RDF graph,
+    loaded from cpmeta dump file(s) (see LocalClient, 'sparql.backend' and 'sparql.dump').
+
+    Responses could be recorded in, or replayed from, a fixture directory (see fixture),
+    to run offline, and reproducibly.
+
+    Queries could also be run as coroutines (see SparqlClient.aquery), in a thread pool,
+    with a bounded number of concurrent queries, and a timeout per query.
+
+    Example usage:
+
+    import icp2edd.sparqlClient as sparqlClient
+
+    client = sparqlClient.getClient()   # get shared client
+    res = client.query(queryString)     # run query on ICOS CP
+    res.bindings                        # list of bindings
+    res = await client.aquery(queryString)  # run query on ICOS CP, as coroutine
+"""
+
+# --- import -----------------------------------
+# import from standard lib
+import asyncio
+import atexit
+import functools
+import gzip
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+# import from other lib
+import requests
+from requests.adapters import HTTPAdapter
+from SPARQLWrapper.SmartWrapper import Bindings
+
+# import from my project
+import icp2edd
+import icp2edd.fixture as fixture
+import icp2edd.setupcfg as setupcfg
+from icp2edd.sparqlCache import SparqlCache
+
+# --- module's variable ------------------------
+# load logger
+_logger = logging.getLogger(__name__)
+
+# default values, used if not set up by configuration file(s)
+_default_endpoint = "https://meta.icos-cp.eu/sparql"
+_default_poolsize = 10
+_default_timeout = 300
+_default_concurrency = 1
+_default_maxget = 4096  # bytes
+_default_budget = 65536  # bytes
+_default_metabudget = 8192  # bytes
+
+# HTTP status of query rejected by the endpoint, because of its size, or its duration
+# Note: not server errors (500, 502), retrying smaller queries would not fix them
+_rejected_status = (408, 413, 414, 431, 503, 504)
+
+# shared client
+_client = None
+_lock = threading.Lock()
+
+
+# ----------------------------------------------
+class _JSONResult(object):
+    """minimal wrapper around a SPARQL JSON result, as expected by SmartWrapper.Bindings"""
+
+    def __init__(self, json_):
+        self._json = json_
+
+    def _convertJSON(self):
+        return self._json
+
+
+# ----------------------------------------------
+class SparqlClient(object):
+    """ """
+
+    def __init__(
+        self,
+        endpoint=None,
+        poolsize=None,
+        timeout=None,
+        cache=None,
+        refresh=False,
+        concurrency=None,
+        maxget=None,
+        budget=None,
+        metabudget=None,
+    ):
+        """initialise SPARQL client
+
+        :param endpoint: SPARQL endpoint url ('https://meta.icos-cp.eu/sparql')
+        :param poolsize: number of connections kept alive in the pool
+        :param timeout: request timeout in seconds
+        :param cache: SparqlCache instance, where store responses [default no cache]
+        :param refresh: do not read response from cache, but refresh it [True,False]
+        :param concurrency: maximum number of queries run at once as coroutines (see aquery)
+        :param maxget: maximum size of url-encoded query sent with HTTP GET, in bytes (POST otherwise)
+        :param budget: maximum size of list inlined in a query (ex: VALUES list), in bytes
+        :param metabudget: maximum size of list of uri inlined in a metadata query, in bytes
+        """
+        self.endpoint = endpoint or _default_endpoint
+        self.poolsize = int(poolsize or _default_poolsize)
+        self.timeout = timeout or _default_timeout
+        self.cache = cache
+        self.refresh = bool(refresh)
+        self.concurrency = _default_concurrency if concurrency is None else int(concurrency)
+        if self.concurrency < 1:
+            raise ValueError(f"Invalid concurrency -{concurrency}-, must be >= 1")
+        self.maxget = int(maxget or _default_maxget)
+        self.budget = int(budget or _default_budget)
+        self.metabudget = int(metabudget or _default_metabudget)
+
+        # thread pool, and semaphore bound to the running event loop, see call
+        self._executor = None
+        self._loop = None
+        self._semaphore = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.poolsize, pool_maxsize=self.poolsize
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Accept": "application/sparql-results+json",
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+                "User-Agent": f"{icp2edd.__name__}/{icp2edd.__version__.split()[-1]}",
+            }
+        )
+
+    def _fetch(self, query_, info_=None):
+        """send query to the endpoint, and return SPARQL JSON result as dictionary
+
+        query larger than 'maxget' is sent with HTTP POST
+
+        :param info_: dictionary, filled with HTTP status, and response size in bytes
+        """
+        params = {"query": query_}
+        if len(urlencode(params)) > self.maxget:
+            r = self.session.post(self.endpoint, data=params, timeout=self.timeout)
+        else:
+            r = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+        if info_ is not None:
+            info_["status"] = r.status_code
+            info_["bytes"] = len(r.content)
+        # If the response was successful, no Exception will be raised
+        r.raise_for_status()
+        return r.json()
+
+    def query(self, query_, ttl=None, info_=None):
+        """run SPARQL query on endpoint, or read response from cache
+
+        :param query_: SPARQL query string (prefix included)
+        :param ttl: time to live of the cached response, in seconds [default cache ttl]
+            0: response is neither read from, nor stored in, cache
+        :param info_: dictionary, filled with 'cached' (response read from cache),
+            and HTTP 'status' and response 'bytes' (if sent to the endpoint), see queryTrace
+        :raise: FileNotFoundError if replaying fixture, and query was not recorded
+        :return: SPARQLWrapper Bindings object (each binding is a dictionary)
+        """
+        if not isinstance(query_, str):
+            raise TypeError(
+                f'Invalid type value. query: \n"""{query_}"""\nmust be string, '
+                f"here {type(query_)}"
+            )
+
+        fix = fixture.getFixture()
+        if fix is not None and fix.replay:
+            # read recorded response, instead of sending query
+            json_ = fix.loadQuery(query_)
+            if info_ is not None:
+                info_.update(cached=False, status=None)
+            return Bindings(_JSONResult(json_))
+
+        cache = self.cache if ttl != 0 else None
+        json_ = None
+        if cache is not None and not self.refresh:
+            json_ = cache.get(query_)
+
+        if info_ is not None:
+            info_["cached"] = json_ is not None
+
+        if json_ is None:
+            json_ = self._fetch(query_, info_=info_)
+            if cache is not None:
+                cache.put(query_, json_, ttl=ttl)
+
+        if fix is not None:
+            fix.saveQuery(query_, json_)
+
+        return Bindings(_JSONResult(json_))
+
+    def getRecords(self, keys_):
+        """return {key: SPARQL JSON result} of records cached under keys_ (see putRecords)
+
+        a record is a part of a SPARQL JSON result (ex: rows of a single uri), cached on its own.
+        Note: nothing is read if cache is refreshed, or fixture set up (every query is sent)
+        """
+        if self.cache is None or self.refresh or fixture.getFixture() is not None:
+            return {}
+        return self.cache.getMany(keys_)
+
+    def putRecords(self, records_, ttl=None):
+        """store records {key: SPARQL JSON result} in cache
+
+        :param ttl: time to live of the cached records, in seconds [default cache ttl]
+        """
+        if self.cache is None or fixture.getFixture() is not None or not records_:
+            return
+        self.cache.putMany(records_, ttl=ttl)
+
+    async def call(self, func_, *args):
+        """run blocking function in the client's thread pool, as coroutine
+
+        at most 'concurrency' functions run at once, each one for at most 'timeout' seconds
+        (asyncio.TimeoutError is raised otherwise)
+
+        Note: a thread can not be stopped, function timed out keeps running in the thread pool,
+        and keeps its slot until it returns, so retries (ex: _bisectAsync) do not exceed 'concurrency'
+        """
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            # semaphore is bound to the event loop
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._executor is None:
+            with _lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.concurrency, thread_name_prefix="sparql"
+                    )
+
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self._executor, functools.partial(func_, *args))
+        except BaseException:
+            semaphore.release()
+            raise
+        # slot is released when function returns, not when it times out
+        future.add_done_callback(lambda _: semaphore.release())
+        return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+
+    async def aquery(self, query_, ttl=None, info_=None):
+        """run SPARQL query on endpoint, or read response from cache, as coroutine
+
+        see query, and call
+        """
+        return await self.call(self.query, query_, ttl, info_)
+
+    def close(self):
+        """close every connections of the pool, and the cache"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+# ----------------------------------------------
+class LocalClient(SparqlClient):
+    """SPARQL client running the same queries on a local RDF graph, instead of the endpoint
+
+    graph is loaded, at start up, from cpmeta dump file(s) (N-Triples, Turtle, RDF/XML,...
+    optionally gzipped), so that runs do not depend on ICOS CP availability, nor on its rate limits.
+
+    Note: requires rdflib (optional dependency)
+    """
+
+    def __init__(self, dump=None, **kwargs):
+        """initialise local SPARQL client
+
+        :param dump: list of RDF dump files, loaded in the graph
+        :param kwargs: see SparqlClient (cache is ignored)
+        """
+        try:
+            import rdflib
+        except ImportError:
+            _logger.error("local SPARQL backend requires rdflib, try: pip install rdflib")
+            raise
+
+        # do not mix local responses with ICOS CP ones
+        kwargs["cache"] = None
+        super().__init__(**kwargs)
+
+        if not dump:
+            raise ValueError("local SPARQL backend requires dump file(s), see 'sparql.dump'")
+
+        self.graph = rdflib.Graph()
+        for path in dump:
+            self._load(Path(path))
+        self.endpoint = f"local graph ({len(self.graph)} triples)"
+
+        # rdflib query parser is not thread safe
+        self._graphLock = threading.Lock()
+
+    def _load(self, path_):
+        """load RDF dump file in the graph, format guessed from file extension"""
+        from rdflib.util import guess_format
+
+        name = path_.stem if path_.suffix == ".gz" else path_.name
+        fmt = guess_format(name)
+        if fmt is None:
+            raise ValueError(f"unknown RDF format of dump file {path_}")
+
+        _logger.info(f"load RDF dump {path_}")
+        if path_.suffix == ".gz":
+            with gzip.open(path_, "rb") as f:
+                self.graph.parse(f, format=fmt)
+        else:
+            self.graph.parse(str(path_), format=fmt)
+
+    def _fetch(self, query_, info_=None):
+        """run query on the local graph, and return SPARQL JSON result as dictionary"""
+        with self._graphLock:
+            data = self.graph.query(query_).serialize(format="json")
+        if info_ is not None:
+            info_["status"] = None
+            info_["bytes"] = len(data)
+        return json.loads(data)
+
+
+# SPARQL client by backend name
+_backends = {"remote": SparqlClient, "local": LocalClient}
+
+
+# ----------------------------------------------
+def getClient():
+    """return the process-wide SPARQL client, create it if need be
+
+    client parameters are read from configuration file(s), see setupcfg,
+    otherwise default values are used.
+    backend 'remote' query ICOS CP endpoint, backend 'local' a graph loaded from dump file(s).
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                backend = getattr(setupcfg, "sparqlBackend", None) or "remote"
+                kwargs = {}
+                if backend == "local":
+                    kwargs["dump"] = getattr(setupcfg, "sparqlDump", None)
+                _client = _backends[backend](
+                    endpoint=getattr(setupcfg, "sparqlEndpoint", None),
+                    poolsize=getattr(setupcfg, "sparqlPoolSize", None),
+                    timeout=getattr(setupcfg, "sparqlTimeout", None),
+                    cache=None if backend == "local" else _setupCache(),
+                    refresh=getattr(setupcfg, "cacheRefresh", False),
+                    concurrency=getattr(setupcfg, "sparqlConcurrency", None),
+                    maxget=getattr(setupcfg, "sparqlMaxGet", None),
+                    budget=getattr(setupcfg, "sparqlBudget", None),
+                    metabudget=getattr(setupcfg, "sparqlMetaBudget", None),
+                    **kwargs,
+                )
+                _logger.debug(f"set up SPARQL client on {_client.endpoint}")
+    return _client
+
+
+def fromRows(rows_):
+    """return SPARQLWrapper Bindings object of SPARQL JSON rows (list of bindings, see toRows)"""
+    variables = list(dict.fromkeys(k for row in rows_ for k in row))
+    return Bindings(_JSONResult({"head": {"vars": variables}, "results": {"bindings": rows_}}))
+
+
+def toRows(bindings_):
+    """return SPARQL JSON rows of a list of bindings (dictionary of SPARQLWrapper Value)"""
+    rows = []
+    for binding in bindings_:
+        row = {}
+        for k, v in binding.items():
+            row[k] = {"type": v.type, "value": v.value}
+            if v.datatype is not None:
+                row[k]["datatype"] = v.datatype
+            if v.lang is not None:
+                row[k]["xml:lang"] = v.lang
+        rows.append(row)
+    return rows
+
+
+def isRejected(err_):
+    """return True if exception means the query was rejected by the endpoint,
+    because of its size or its duration (worth retrying a smaller query)
+    """
+    if isinstance(err_, (requests.exceptions.Timeout, asyncio.TimeoutError)):
+        return True
+    if isinstance(err_, requests.exceptions.HTTPError):
+        return err_.response is not None and err_.response.status_code in _rejected_status
+    return False
+
+
+def _setupCache():
+    """set up SPARQL response cache from configuration file(s), see setupcfg
+
+    :return: SparqlCache instance, or None if cache is disabled or not configured
+    """
+    path = getattr(setupcfg, "cachePath", None)
+    if path is None or getattr(setupcfg, "cacheDisable", False):
+        _logger.debug("no SPARQL cache")
+        return None
+
+    try:
+        cache = SparqlCache(
+            path,
+            ttl=getattr(setupcfg, "cacheTtl", None),
+            size=getattr(setupcfg, "cacheSize", None),
+        )
+    except Exception:
+        _logger.exception(f"can not open SPARQL cache {path}, run without cache")
+        return None
+
+    # print statistics at the end of the run
+    atexit.register(cache.logStats)
+    return cache
+
+
+def resetClient():
+    """close and drop the process-wide SPARQL client
+
+    next call to getClient will create a new one (ex: after configuration changed)
+    """
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+# See PyCharm help at https://www.jetbrains.com/help/pycharm/
@@ -16,20 +16,28 @@
 
 # --- import -----------------------------------
 # import from standard lib
+import asyncio
 import logging
 import traceback
+from collections import ChainMap
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from pprint import pformat
 
 # import from other lib
-from SPARQLWrapper.SmartWrapper import Value as SmartWrapperValue
-
 # > conda-forge
 # import from my project
 import icp2edd.parameters as parameters
+import icp2edd.refreshState as refreshState
 import icp2edd.setupcfg as setupcfg
+import icp2edd.sparqlClient as sparqlClient
 import icp2edd.util as util
 from icp2edd.icpobj import *
+from icp2edd.icpobj.icpObj import typeMemo
+from icp2edd.metaStore import MetaStore
+from icp2edd.pathRules import PathRules
+from icp2edd.renameMap import RenameMap
+from icp2edd.rdfTerm import Term
 
 # --- module's variable ------------------------
 # load logger
@@ -60,19 +68,41 @@ class SuperICPObj(object):
         """
         self._from = submfrom
         self._product = product
-        #
-        self.meta = {}
+        # metadata of every explored uri, merged in place
+        self.meta = MetaStore()
         self.DataObject = {}
         self.DataVariable = {}
         self.classprop = {}
-        #
-        self.tmp = {}
+        # memo of flattened attributes, by (uri, predicate path), see repack
+        self._flat = {}
+        # memo of flattened attributes, prefixed by the linking attribute, and renamed, by (uri, predicate path)
+        self._prefixed = {}
+        # stack frame of each (uri, predicate path) being flattened
+        self._spreading = {}
+        # (uri, predicate path) reached from each flattened (uri, predicate path)
+        self._reach = {}
+        # variable uri reached from each flattened (uri, predicate path), and their variableId
+        self._flatVars = {}
+        self._variableIds = {}
+        # resolve object type and class of uri (memoised during the whole run)
+        self._resolver = ICPObj()
+        # number of queries run at once (1: sequential harvest)
+        self._concurrency = sparqlClient.getClient().concurrency
+        # number of threads exploring the metadata graph (1: see _concurrency)
+        self._workers = int(getattr(setupcfg, "metaWorkers", None) or 1)
+        # maximum depth explored from DataObject (None: no limit), and number of uri found by depth
+        self._maxDepth = getattr(setupcfg, "metaDepth", None)
+        self._depthCount = {}
 
         # check parameters file
         param = parameters.main()
         #
         self.dict_convAttr = param["attributes"]["convert"]
         self.sep = param["attributes"]["sep"]
+        # attribute names to convert, compiled once (see renameMap)
+        self._rename = RenameMap(self.dict_convAttr, sep=self.sep)
+        # rules pruning the predicate paths explored, and flattened (see pathRules)
+        self._rules = PathRules(sep=self.sep, **param["traversal"])
 
         try:
             if self._from is None:
@@ -81,13 +111,18 @@ class SuperICPObj(object):
                 listuri = self._listDatasetLoaded()
                 # listuri = ["https://meta.icos-cp.eu/objects/uwXo3eDGipsYBv0ef6H2jJ3Z",]
                 # listuri = ["https://meta.icos-cp.eu/objects/-GpJLAEmZzHt48iB3l1eBuct"]
-                for uri in listuri:
-                    _logger.info("get DataObject metadata from ICOS CP")
-                    _ = cpmeta.DataObject(uri=uri)
-                    _.getMeta()
-                    _.show()
-                    #
-                    self.meta = {**_.meta, **self.meta}
+                if self._concurrency > 1:
+                    util.runAsync(self._loadDataObjectAsync(listuri))
+                else:
+                    for uri in listuri:
+                        _logger.info("get DataObject metadata from ICOS CP")
+                        _ = cpmeta.DataObject(uri=uri)
+                        _.getMeta()
+                        _.show()
+                        #
+                        self.meta.merge(_.meta)
+                        for k in _.meta:
+                            typeMemo.put(k, _._object)
             else:
                 # list all datasets submitted since self._from
                 _logger.info(
@@ -99,7 +134,9 @@ class SuperICPObj(object):
                 _.getMeta()
                 _.show()
                 #
-                self.meta = {**_.meta, **self.meta}
+                self.meta.merge(_.meta)
+                for k in _.meta:
+                    typeMemo.put(k, _._object)
 
         except Exception:
             _logger.exception(
@@ -111,19 +148,36 @@ class SuperICPObj(object):
         (filename, line_number, function_name, text) = traceback.extract_stack()[-2]
         self._instance_name = text[: text.find("=")].strip()
 
+    async def _loadDataObjectAsync(self, listuri_):
+        """get DataObject metadata of each list of uri, concurrently"""
+        _logger.info("get DataObject metadata from ICOS CP")
+        objs = [cpmeta.DataObject(uri=uri) for uri in listuri_]
+        await asyncio.gather(*(_.getMetaAsync() for _ in objs))
+        # merge in the same order as sequential harvest
+        for _ in objs:
+            _.show()
+            #
+            self.meta.merge(_.meta)
+            for k in _.meta:
+                typeMemo.put(k, _._object)
+
     def getAttr(self):
         """ """
         list_dataObj = list(self.meta.keys())
+        # resolve object type of every DataObject in one go
+        self._resolve(list_dataObj)
+
+        # incremental refresh: do not explore again DataObject unchanged since last run
+        state = refreshState.getState()
+        if state is not None:
+            list_dataObj = self._reuse(state, list_dataObj)
+
         # fill self.meta
-        for uri in list_dataObj:
-            print(f"\nlook in uri: {uri} ", end="")
-            _logger.info(f"look in uri: {uri}")
-            self._getSubAttr(uri)
-        print(f"")
+        self._explore(list_dataObj)
 
         # ll=['http://meta.icos-cp.eu/resources/cpmeta/temperature','http://meta.icos-cp.eu/resources/cpmeta/portion','http://meta.icos-cp.eu/resources/cpmeta/salinity']
         # self.repackMeta(self.meta.keys())
-        # print(pformat(self.tmp))
+        # print(pformat(self._flat))
 
         # repack with objtype
         for uri in list_dataObj:
@@ -132,27 +186,178 @@ class SuperICPObj(object):
             self.repack(uri)
         print(f"")
 
+        if state is not None:
+            self._store(state, list_dataObj)
+
+        self._logMemoStats()
+
         return {**self.DataObject, **self.DataVariable}
 
-    def _renameKeyDic(self, _):
+    def _reuse(self, state_, uris_):
         """
-        rename dictionary keys (if listed in dict_convAttr):
-        :return: renamed dictionary
+        fill DataObject, and DataVariable, with attributes stored by the previous run (see refreshState),
+        for DataObject whose fingerprint, and those of the uri reached while flattening it, did not change
+
+        :return: list of DataObject uri to explore again
         """
-        for oldKey, newKey in self.dict_convAttr.items():
-            _ = dict((newKey, v) if k == oldKey else (k, v) for k, v in _.items())
-        return _
+        datasetIds = {uri: self._datasetId(uri) for uri in uris_}
+        changed = self._changed(state_.reached(datasetIds.values()))
+
+        explore = []
+        for uri in uris_:
+            datasetId = datasetIds[uri]
+            entry = state_.get(datasetId, uri, refreshState.fingerprint(self.meta[uri]), changed)
+            if entry is None:
+                explore.append(uri)
+            else:
+                self.DataObject[datasetId] = util.Accumulator(entry["attributes"])
+                self.DataVariable.update(
+                    {k: util.Accumulator(v) for k, v in entry["variables"].items()}
+                )
+
+        _logger.info(f"incremental refresh: explore {len(explore)}/{len(uris_)} DataObject")
+        return explore
+
+    def _changed(self, nodes_):
+        """
+        return set of uri, among nodes_, whose metadata changed since last run
+
+        only uri of 'mutable' cache tier are fetched again (one query per class, and list of uri),
+        others (static objects, specifications,...) are considered unchanged, see refreshState
+        metadata are fetched from ICOS CP, not read from cache (but cache is refreshed)
+
+        :param nodes_: uri reached by stored datasets {uri: [object type, fingerprint]}
+        """
+        import icp2edd.icpobj
+
+        groups = {}
+        for uri, (objtype, _) in nodes_.items():
+            # uri without allowed object type are not fetched
+            if objtype is not None:
+                groups.setdefault(objtype, []).append(uri)
+
+        client = sparqlClient.getClient()
+        changed = set()
+        refresh, client.refresh = client.refresh, True
+        try:
+            for objtype, uris in sorted(groups.items()):
+                klass = vars(icp2edd.icpobj).get(objtype)
+                if klass is None:
+                    changed.update(uris)
+                    continue
+                for chunk in util.chunksByBytes(uris, client.metabudget):
+                    _ = klass(uri=chunk)
+                    if _._cacheTier() != "mutable":
+                        break
+                    _.getMeta()
+                    changed.update(
+                        uri
+                        for uri in chunk
+                        if refreshState.fingerprint(_.meta.get(uri, {})) != nodes_[uri][1]
+                    )
+        finally:
+            client.refresh = refresh
+
+        _logger.info(f"incremental refresh: {len(changed)}/{len(nodes_)} linked uri changed")
+        return changed
+
+    def _reached(self, root_):
+        """return uri reached while flattening root_, and its variables {uri: (object type, fingerprint)}"""
+        reached = {uri for uri, _ in self._reach[root_]}
+        for var in self._flatVars[root_]:
+            var = (var, self._rules.root)
+            if var in self._reach:
+                reached.update(uri for uri, _ in self._reach[var])
+        return {
+            uri: (self._getObjtype(uri), refreshState.fingerprint(self.meta[uri])) for uri in reached
+        }
+
+    def _store(self, state_, uris_):
+        """store attributes of explored DataObject, and of their variables, for the next run"""
+        for uri in uris_:
+            root = (uri, self._rules.root)
+            if root not in self._flat:
+                continue
+            datasetId = self._datasetId(uri)
+            variables = {}
+            for var in self._flatVars[root]:
+                if var in self._variableIds:
+                    variableId = self._variableIds[var]
+                    variables[variableId] = self.DataVariable[variableId]
+            state_.put(
+                datasetId,
+                uri,
+                refreshState.fingerprint(self.meta[uri]),
+                self.DataObject[datasetId],
+                variables,
+                self._reached(root),
+            )
+        state_.save()
+
+    def _datasetId(self, uri_):
+        """return datasetId of DataObject uri_, built from its filename"""
+        # Warning: linked to:
+        # - 'cpmeta:hasName' in StaticObject
+        if "filename" not in self.meta[uri_]:
+            _logger.critical(
+                f"can not find 'filename' attribute in meta of {uri_}.\n "
+                f"Check value of 'cpmeta:hasName' in StaticObject"
+            )
+        filename = Path(self.meta[uri_]["filename"][0].value)
+        # datasetId = case.camel('icos_' + filename.stem, sep='_')
+        return util.datasetidCase(filename)
+
+    def _resolve(self, uris_):
+        """resolve, in one go, object type of every uri not already memoised"""
+        self._resolver.resolveTypes(uris_)
+
+    def _getObjtype(self, uri_):
+        """return object type of uri_"""
+        return self._resolver.resolveTypes([uri_])[uri_]
+
+    def _logMemoStats(self):
+        """log statistics of the memo shared during the run"""
+        for k, v in self._resolver.memoStats().items():
+            _logger.info(
+                f"memo {k}: {v['hits']} hits, {v['misses']} misses, {v['size']}/{v['maxsize']} entries"
+            )
 
     def repack(self, uri_):
+        """
+        flatten attributes of DataObject, or variable, uri_ (see spread), in DataObject, or DataVariable
+
+        with a loop between station S and organization O, S met again while flattening O (from D1)
+        gives the attributes of S gathered so far, and O is read from memo for D2:
+
+        >>> import contextlib, io
+        >>> o = SuperICPObj.__new__(SuperICPObj)
+        >>> o.meta = {
+        ...     "D1": {"name": [Term("literal", "d1")], "station": [Term("uri", "S")]},
+        ...     "D2": {"name": [Term("literal", "d2")], "agent": [Term("uri", "O")]},
+        ...     "S": {"label": [Term("literal", "s")], "responsible_organization": [Term("uri", "O")]},
+        ...     "O": {"name": [Term("literal", "o1"), Term("literal", "o2")], "at_location": [Term("uri", "S")]},
+        ... }
+        >>> o._getObjtype = {"D1": "cpmeta.DataObject", "D2": "cpmeta.DataObject"}.get
+        >>> o._datasetId = lambda uri_: uri_.lower()
+        >>> o._rules, o._rename, o.sep = PathRules(), RenameMap({}), "_"
+        >>> o._flat, o._prefixed, o._spreading, o._reach, o._flatVars = {}, {}, {}, {}, {}
+        >>> o.DataObject = {}
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     o.repack("D1")
+        ...     o.repack("D2")
+        >>> o.DataObject["d1"]
+        {'name': ['d1'], 'station_label': ['s'], 'station_responsible_organization_name': ['o2', 'o1'],
+         'station_responsible_organization_at_location_label': ['s']}
+        >>> o.DataObject["d2"]
+        {'name': ['d2'], 'agent_name': ['o2', 'o1'], 'agent_at_location_label': ['s']}
+        >>> sorted(uri for uri, _ in o._reach[("D2", None)])
+        ['D2', 'O', 'S']
+        """
         # TODO see if it could be merge with getSubAttr
         _logger.debug(f"repack uri {uri_}")
 
-        def spread(uri_, exclude_=[], cnt_=0):
-
-            cnt_ += 1
-            print("." * cnt_, end="", flush=True)
-
-            self.tmp[uri_] = {}
+        def edges(uri_):
+            """yield (attribute, Term) of uri_, but 'uri' and list_rec_search attributes"""
             if uri_ not in self.meta.keys():
                 _logger.critical(f"Try spreading unknown uri -{uri_}-")
                 raise SystemExit(1)
@@ -160,62 +365,113 @@ class SuperICPObj(object):
             for k, lv in self.meta[uri_].items():
                 if k in ["uri"]:
                     _logger.debug(f"ignore uri attribute")
-                    # if k not in self.tmp[uri_].keys():
-                    #     d = {k: str(lv[0].value)}
-                    #     self.tmp[uri_] = util.combine_dict_in_list(d, self.tmp[uri_])
                 elif k in list_rec_search:
                     _logger.debug(
                         f"ignore {k} attribute. do not iterate to avoid recursive search"
                     )
                 else:
                     for v in lv:
-                        if not isinstance(v, SmartWrapperValue):
+                        if not isinstance(v, Term):
                             raise TypeError(
-                                "invalid type: element -{v}- must be of type SmartWrapperValue"
+                                "invalid type: element -{v}- must be of type Term"
                             )
-
-                        d = {}
-                        if v.type != "uri":
-                            d[k] = [v.value]
+                        yield k, v
+
+        def prefix(k_, key_, flat_=None):
+            """return flattened attributes of key_ (uri, predicate path), prefixed by k_, and renamed, read from memo if any
+
+            :param flat_: attributes of key_ gathered so far, while flattening it (not memoised, see spread)
+            """
+            if flat_ is not None:
+                return {self._rename(k_ + self.sep + kk): vv for kk, vv in flat_.items()}
+            prefixed = self._prefixed.setdefault(key_, {})
+            if k_ not in prefixed:
+                # separator between object and attribute
+                prefixed[k_] = {
+                    self._rename(k_ + self.sep + kk): vv for kk, vv in self._flat[key_].items()
+                }
+            return prefixed[k_]
+
+        def spread(uri_, exclude_=()):
+            """
+            return flattened, and renamed, attributes of uri_
+
+            subtree is walked depth-first with an explicit stack (no recursion).
+            flattened attributes are memoised by uri (and predicate path, with traversal rules, see pathRules)
+            for the whole run, and read from memo wherever the uri is met again; uri_ itself is flattened again.
+            uri met again while being flattened (loop) gives the attributes gathered so far.
+
+            Note: memo is shared by every DataObject, and variable, so with loops,
+            flattened attributes depend on the order uri are flattened.
+            """
+            root = (uri_, self._rules.root)
+            # flattened again, forget memo of its prefixed attributes
+            self._prefixed.pop(root, None)
+            # frame: [(uri, predicate path), attributes iterator, flattened attributes (filled in place),
+            #         linking attribute, variable uri reached, (uri, predicate path) reached]
+            frame = [root, edges(uri_), util.Accumulator(prepend=True), None, {}, set()]
+            stack = [frame]
+            self._spreading[root] = frame
+            print(".", end="", flush=True)
+            while stack:
+                key, it, flat, link, variables, reach = stack[-1]
+
+                for k, v in it:
+                    if v.type != "uri":
+                        flat.add(self._rename(k), v.value)
+                        continue
+
+                    path = self._rules.extend(key[1], k)
+                    if not self._rules.follow(path) or (path is not None and v.value not in self.meta):
+                        # pruned by traversal rules, not explored
+                        pass
+                    elif self._getObjtype(v.value) in exclude_:
+                        self.repack(v.value)
+                        variables[v.value] = None
+                    else:
+                        child = (v.value, path)
+                        if child in self._spreading:
+                            # uri being flattened, avoid infinity loop (attributes gathered so far)
+                            partial = self._spreading[child]
+                            flat.merge(prefix(k, child, flat_=partial[2]))
+                            variables.update(partial[4])
+                            reach.update(partial[5])
+                            reach.add(child)
+                        elif child in self._flat:
+                            flat.merge(prefix(k, child))
+                            variables.update(self._flatVars[child])
+                            reach.update(self._reach[child])
                         else:
-                            objtype = ICPObj(uri=v.value).objtype
-                            if objtype not in exclude_:
-                                if v.value in self.tmp.keys():
-                                    for kk, vv in self.tmp[v.value].items():
-                                        # separator between object and attribute
-                                        kkk = k + self.sep + kk
-                                        d[kkk] = vv
-                                else:
-                                    dd = spread(v.value, exclude_=exclude_, cnt_=cnt_)
-                                    for kk, vv in dd.items():
-                                        # separator between object and attribute
-                                        kkk = k + self.sep + kk
-                                        d[kkk] = vv
-                            else:
-                                self.repack(v.value)
-
-                        d = self._renameKeyDic(d)
-                        self.tmp[uri_] = util.combine_dict_in_list(d, self.tmp[uri_])
-
-            return self.tmp[uri_]
+                            # flatten child first
+                            frame = [child, edges(v.value), util.Accumulator(prepend=True), k, {}, set()]
+                            stack.append(frame)
+                            self._spreading[child] = frame
+                            print("." * len(stack), end="", flush=True)
+                            break
+                else:
+                    # every attributes flattened
+                    stack.pop()
+                    del self._spreading[key]
+                    reach.add(key)
+                    self._flat[key] = flat
+                    self._flatVars[key] = variables
+                    self._reach[key] = frozenset(reach)
+                    if not stack:
+                        return flat
+
+                    # add it to parent
+                    parent = stack[-1]
+                    parent[2].merge(prefix(link, key))
+                    parent[4].update(variables)
+                    parent[5].update(reach)
 
         # check object type
-        _ = ICPObj(uri=uri_)
-        objtype = _.objtype
+        objtype = self._getObjtype(uri_)
 
         if objtype in list_DataObject:
-            # Warning: linked to:
-            # - 'cpmeta:hasName' in StaticObject
-            if "filename" not in self.meta[uri_]:
-                _logger.critical(
-                    f"can not find 'filename' attribute in meta of {uri_}.\n "
-                    f"Check value of 'cpmeta:hasName' in StaticObject"
-                )
-            filename = Path(self.meta[uri_]["filename"][0].value)
-            # datasetId = case.camel('icos_' + filename.stem, sep='_')
-            datasetId = util.datasetidCase(filename)
+            datasetId = self._datasetId(uri_)
 
-            self.DataObject[datasetId] = spread(uri_, exclude_=list_VariableObject)
+            self.DataObject[datasetId] = spread(uri_, exclude_=tuple(list_VariableObject))
 
         elif objtype in list_VariableObject:
             # Warning: linked to:
@@ -229,79 +485,383 @@ class SuperICPObj(object):
             # variableId = case.camel(varname, sep='_')
             variableId = util.filterBracket(varname)
 
+            self._variableIds[uri_] = variableId
             self.DataVariable[variableId] = spread(uri_)
 
         else:
             _logger.error(f"should not be run objtype {objtype}")
 
-        # clean
-        # self.tmp = {}
-
-    def _getSubAttr(self, uri_, cnt_=0):
+    def _linked(self, nodes_, meta_=None):
         """
-        dict1 = {name: value, name: value, ...}
+        return list of nodes linked to nodes_, not yet explored
+
+        a node is a uri, with the predicate path reaching it (uri, path):
+        - without traversal rules, path is None, and a uri is explored once (see pathRules)
+        - with traversal rules, path is a tuple of (attribute, uri) from DataObject (or variable),
+          a uri could be explored again by another path (without fetching it again),
+          path not followed by the rules, or going twice through the same uri, are pruned.
+
+        :param meta_: dictionary where read metadata of nodes_ [default self.meta]
 
         special cases for keys 'uri' and 'NextVersionOf'.
         - 'uri': do not iterate to avoid infinity loop
         - 'NextVersionOf' : do not iterate to avoid recursive search inside previous versions
         """
-        cnt_ += 1
-        print("." * cnt_, end="", flush=True)
-
-        for k, lv in self.meta[uri_].items():
-            if k == "uri":
-                # do nothing, you are currently exploring it
-                _logger.debug(f"do nothing, you are currently exploring this uri -{k}-")
-            elif k in list_rec_search:
-                # Warning: linked to:
-                # - 'cpmeta:isNextVersionOf'  in StaticObject, and Collection
-                # - 'cpmeta:isQualityFlagFor' in DatasetColumn
-                # - 'prov:hadPrimarySource'   in StaticObject, and Collection
-                # - 'prov:wasRevisionOf'      in StaticObject, and Collection
-                _logger.debug(
-                    f"key {k} found. do not iterate to avoid recursive search"
-                )
-            else:
+        meta = self.meta if meta_ is None else meta_
+        linked = []
+        for uri_, path_ in nodes_:
+            if path_ and self._getObjtype(uri_) in list_VariableObject:
+                # variables are flattened apart, from their own path (see repack)
+                path_ = ()
+            if path_ is not None:
+                # attributes of the path, and uri along it
+                names = tuple(_ for _, __ in path_)
+                along = {uri_, *(_ for __, _ in path_)}
+            for k, lv in meta[uri_].items():
+                if k == "uri":
+                    # do nothing, you are currently exploring it
+                    continue
+                elif k in list_rec_search:
+                    # Warning: linked to:
+                    # - 'cpmeta:isNextVersionOf'  in StaticObject, and Collection
+                    # - 'cpmeta:isQualityFlagFor' in DatasetColumn
+                    # - 'prov:hadPrimarySource'   in StaticObject, and Collection
+                    # - 'prov:wasRevisionOf'      in StaticObject, and Collection
+                    continue
+                if path_ is not None and not self._rules.follow(names + (k,)):
+                    # pruned by traversal rules
+                    continue
                 for v in lv:
-                    if not isinstance(v, SmartWrapperValue):
+                    if not isinstance(v, Term):
                         raise TypeError(
-                            "invalid type: element -{v}- must be of type SmartWrapperValue"
+                            "invalid type: element -{v}- must be of type Term"
                         )
+                    if v.type != "uri":
+                        continue
+                    if path_ is None:
+                        if v.value not in self.meta:
+                            linked.append((v.value, None))
+                    elif v.value not in along:
+                        linked.append((v.value, path_ + ((k, v.value),)))
+        return list(dict.fromkeys(linked))
+
+    def _group(self, uris_, parts_=1):
+        """
+        group uri by class, each group is split in lists as large as the SPARQL client's metadata budget allows
+        (and in at least 'parts_' lists, if possible), one getMeta query per list.
 
-                    if v.type == "uri":
-                        uri = v.value
-                        if uri in self.meta:
-                            _logger.debug(f"do nothing, uri -{uri}- already in meta")
-                        else:
-                            # check object type
-                            _ = ICPObj(uri=uri)
-                            objtype = _.objtype
-
-                            # dummy patch cause issue on instrument data
-                            # https://meta.icos-cp.eu/objects/Rd3xqDBV1PhqO-7Y9GGIRw0q
-                            if objtype is not None:
-                                try:
-                                    klass = type(globals()[objtype]())
-                                    _ = klass(uri=uri)
-                                    try:
-                                        _.getMeta()
-                                        self.meta = {**_.meta, **self.meta}
-                                        _logger.debug(
-                                            f"dig into to explore {objtype} uri: {uri}"
-                                        )
-                                        self._getSubAttr(uri, cnt_)
-                                    except Exception:
-                                        _logger.exception(
-                                            f"can not found metadata from {objtype}[{uri}]"
-                                        )
-                                        raise
-                                except Exception:
-                                    _logger.exception(
-                                        f"can not found class {objtype}, for object {uri}"
-                                    )
-                                    raise
-                            else:
-                                self.meta[uri] = {}
+        :return: list of (class, list of uri), and list of uri without allowed object type
+        """
+        # resolve object type of every uri in one go
+        self._resolve(uris_)
+
+        groups = {}
+        unknown = []
+        for uri in uris_:
+            # dummy patch cause issue on instrument data
+            # https://meta.icos-cp.eu/objects/Rd3xqDBV1PhqO-7Y9GGIRw0q
+            klass = self._resolver.resolveKlass(uri)
+            if klass is None:
+                unknown.append(uri)
+            else:
+                groups.setdefault(klass, []).append(uri)
+
+        budget = sparqlClient.getClient().metabudget
+        chunks = []
+        for klass, uris in groups.items():
+            _logger.debug(f"dig into to explore {len(uris)} {klass.__name__} uri")
+            size = sum(len(uri.encode()) + 3 for uri in uris)
+            for chunk in util.chunksByBytes(uris, min(budget, -(-size // parts_))):
+                chunks.append((klass, chunk))
+        return chunks, unknown
+
+    def _tooDeep(self, depth_, uris_):
+        """count uris_ found at depth_, return True if depth_ exceeds maximum depth (see 'meta.depth')"""
+        self._depthCount[depth_] = self._depthCount.get(depth_, 0) + len(uris_)
+        return self._maxDepth is not None and depth_ > self._maxDepth
+
+    def _nextLevel(self, frontier_, depth_, visited_):
+        """
+        given the nodes explored at one depth, return ICPObj instances to fetch the next depth (depth_),
+        with the list of uri each one fetches, and the nodes to explore next
+
+        unseen linked nodes (see _linked) are claimed in visited_ (see util.VisitedSet),
+        uri not yet fetched are grouped by class (see _group).
+        uri without allowed object type, or beyond maximum depth, are set as explored, without metadata.
+        """
+        linked = visited_.claim(self._linked(frontier_))
+        uris = list(dict.fromkeys(uri for uri, _ in linked if uri not in self.meta))
+        if self._tooDeep(depth_, uris):
+            for uri in uris:
+                self.meta[uri] = {}
+            return [], []
+
+        chunks, unknown = self._group(uris)
+        for uri in unknown:
+            self.meta[uri] = {}
+
+        level = []
+        for klass, chunk in chunks:
+            try:
+                level.append((klass(uri=chunk), chunk))
+            except Exception:
+                _logger.exception(f"can not found class {klass.__name__}, for objects {chunk}")
+                raise
+        return level, linked
+
+    def _addLevel(self, level_):
+        """merge metadata fetched at one depth (see _nextLevel)"""
+        for _, uris in level_:
+            self.meta.merge(_.meta)
+            # uri without metadata are explored too
+            for uri in uris:
+                if uri not in self.meta:
+                    self.meta[uri] = {}
+
+    def _getSubAttr(self, uris_):
+        """
+        explore metadata graph, breadth-first, from uris_
+
+        at each depth, every unseen uri linked to the current frontier are fetched
+        with one query per class (see _nextLevel),
+        so the number of queries scales with the depth of the graph, not with its number of nodes.
+
+        the frontier is the only worklist (no recursion), uri already in meta are never fetched again,
+        whatever the loops in the graph.
+
+        meta = {uri: binding, ...}
+
+        with a loop between station S and organization O, both are fetched once, at depth 1
+        (nothing left to fetch at depth 2):
+
+        >>> import contextlib, io
+        >>> graph = {
+        ...     "D": {"station": [Term("uri", "S")], "agent": [Term("uri", "O")]},
+        ...     "S": {"responsible_organization": [Term("uri", "O")], "label": [Term("literal", "s")]},
+        ...     "O": {"at_location": [Term("uri", "S")]},
+        ... }
+        >>> class Fake(object):
+        ...     def __init__(self, uri):
+        ...         self.meta = {_: graph[_] for _ in uri}
+        ...     def getMeta(self):
+        ...         pass
+        >>> queried = []
+        >>> o = SuperICPObj.__new__(SuperICPObj)
+        >>> o.meta, o._rules, o._maxDepth, o._depthCount = MetaStore(D=graph["D"]), PathRules(), None, {}
+        >>> o._group = lambda uris_, parts_=1: (queried.append(uris_) or [(Fake, uris_)], [])
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     o._getSubAttr(["D"])
+        >>> list(o.meta), queried
+        (['D', 'S', 'O'], [['S', 'O'], []])
+
+        with maximum depth 1, O (reached from D through S, at depth 2) is set as explored, without metadata:
+
+        >>> queried.clear()
+        >>> o.meta, o._maxDepth, o._depthCount = MetaStore(D={"station": graph["D"]["station"]}), 1, {}
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     o._getSubAttr(["D"])
+        >>> o.meta["O"], queried, o._depthCount
+        ({}, [['S']], {0: 1, 1: 1, 2: 1})
+        """
+        frontier = [(uri, self._rules.root) for uri in uris_]
+        visited = util.VisitedSet(frontier)
+        self._tooDeep(0, uris_)
+        cnt = 0
+        while frontier:
+            cnt += 1
+            print("." * cnt, end="", flush=True)
+
+            level, frontier = self._nextLevel(frontier, cnt, visited)
+            for _, uris in level:
+                try:
+                    _.getMeta()
+                except Exception:
+                    _logger.exception(f"can not found metadata from {_.objtype}{uris}")
+                    raise
+            self._addLevel(level)
+
+    async def _getSubAttrAsync(self, uris_):
+        """
+        asynchronous version of _getSubAttr
+
+        at each depth, queries of every class are run concurrently.
+        """
+        loop = asyncio.get_event_loop()
+        frontier = [(uri, self._rules.root) for uri in uris_]
+        visited = util.VisitedSet(frontier)
+        self._tooDeep(0, uris_)
+        cnt = 0
+        while frontier:
+            cnt += 1
+            print("." * cnt, end="", flush=True)
+
+            # blocking (object type queries), run in default thread pool, outside the client's slots
+            level, frontier = await loop.run_in_executor(
+                None, self._nextLevel, frontier, cnt, visited
+            )
+            try:
+                await asyncio.gather(*(_.getMetaAsync() for _, uris in level))
+            except Exception:
+                _logger.exception(f"can not found metadata at depth {cnt}")
+                raise
+            self._addLevel(level)
+
+    def _fetch(self, klass_, nodes_, visited_, claimed_, depth_):
+        """
+        fetch metadata of the uri of nodes_ (at depth_), and claim their unseen linked nodes (see _expand)
+
+        run in a worker thread, see _getSubAttrThreaded
+
+        :return: metadata of the uri of nodes_, and output of _expand
+        """
+        uris = list(dict.fromkeys(uri for uri, _ in nodes_))
+        _ = klass_(uri=uris)
+        try:
+            _.getMeta()
+        except Exception:
+            _logger.exception(f"can not found metadata from {_.objtype}{uris}")
+            raise
+
+        meta = dict(_.meta)
+        # uri without metadata are explored too
+        for uri in uris:
+            meta.setdefault(uri, {})
+
+        return (meta,) + self._expand(nodes_, meta, visited_, claimed_, depth_)
+
+    def _expand(self, nodes_, meta_, visited_, claimed_, depth_):
+        """
+        claim unseen nodes linked to nodes_ (at depth_) in visited_, and their unseen uri in claimed_
+        (see util.VisitedSet), group nodes whose uri is claimed by class (see _group)
+
+        :param meta_: dictionary where read metadata of nodes_
+
+        :return: list of (class, list of nodes) to fetch next,
+            list of nodes whose uri is fetched by another task (only with traversal rules, see _linked),
+            list of uri without metadata (without allowed object type, or beyond maximum depth),
+            and number of linked uri claimed
+        """
+        linked = visited_.claim(self._linked(nodes_, meta_))
+        uris = claimed_.claim(uri for uri, _ in linked)
+        if self._maxDepth is not None and depth_ + 1 > self._maxDepth:
+            # beyond maximum depth
+            chunks, unknown = [], uris
+        else:
+            chunks, unknown = self._group(uris, self._workers)
+
+        claimed = set(uris)
+        nodes = {}
+        known = []
+        for node in linked:
+            if node[0] in claimed:
+                nodes.setdefault(node[0], []).append(node)
+            else:
+                known.append(node)
+        chunks = [(klass, [_ for uri in chunk for _ in nodes[uri]]) for klass, chunk in chunks]
+        return chunks, known, unknown, len(uris)
+
+    def _getSubAttrThreaded(self, uris_):
+        """
+        parallel version of _getSubAttr, fetches run in a pool of 'workers' threads
+
+        there is no barrier between depths: as soon as metadata of a list of uri are fetched,
+        their unseen linked nodes, and uri, are claimed in shared visited sets (so each uri is fetched once),
+        grouped by class, and submitted.
+        same pruning as _getSubAttr (see _linked).
+        nodes whose uri is fetched by another task, are explored once it is fetched (only with traversal rules).
+        metadata are merged by uri, in sorted order, whatever the order in which fetches complete.
+
+        same metadata as _getSubAttr, on a loop between station S and organization O:
+
+        >>> import contextlib, io
+        >>> graph = {
+        ...     "D": {"station": [Term("uri", "S")]},
+        ...     "S": {"responsible_organization": [Term("uri", "O")], "label": [Term("literal", "s")]},
+        ...     "O": {"at_location": [Term("uri", "S")]},
+        ... }
+        >>> class Fake(object):
+        ...     def __init__(self, uri):
+        ...         self.meta = {_: graph[_] for _ in uri}
+        ...     def getMeta(self):
+        ...         pass
+        >>> o = SuperICPObj.__new__(SuperICPObj)
+        >>> o.meta, o._rules, o._maxDepth, o._depthCount = MetaStore(D=graph["D"]), PathRules(), None, {}
+        >>> o._workers = 2
+        >>> o._group = lambda uris_, parts_=1: ([(Fake, [_]) for _ in uris_], [])
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     o._getSubAttrThreaded(["D"])
+        >>> o.meta == graph, o._depthCount
+        (True, {0: 1, 1: 1, 2: 1, 3: 0})
+        """
+        roots = [(uri, self._rules.root) for uri in uris_]
+        visited = util.VisitedSet(roots)
+        claimed = util.VisitedSet(self.meta)
+        self._tooDeep(0, uris_)
+
+        fetched = {}
+        meta = ChainMap(fetched, self.meta)
+        # nodes to expand, once their uri is fetched, with their depth
+        waiting = [(node, 0) for node in roots]
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="meta") as pool:
+            # future: depth of the uri fetched
+            pending = {}
+
+            def submit(depth_, chunks_, known_, unknown_, nlinked_):
+                """submit fetches of nodes linked at depth_ + 1 (see _expand)"""
+                nonlocal waiting
+                fetched.update({uri: {} for uri in unknown_})
+                self._depthCount[depth_ + 1] = self._depthCount.get(depth_ + 1, 0) + nlinked_
+                waiting.extend((node, depth_ + 1) for node in known_)
+                for klass, chunk in chunks_:
+                    future = pool.submit(self._fetch, klass, chunk, visited, claimed, depth_ + 1)
+                    pending[future] = depth_ + 1
+
+            while True:
+                # expand nodes whose uri is fetched
+                ready = {}
+                still = []
+                for node, depth in waiting:
+                    if node[0] in meta:
+                        ready.setdefault(depth, []).append(node)
+                    else:
+                        still.append((node, depth))
+                waiting = still
+                for depth, nodes in sorted(ready.items()):
+                    submit(depth, *self._expand(nodes, meta, visited, claimed, depth))
+                if ready:
+                    continue
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    fetched_, *expanded = future.result()
+                    fetched.update(fetched_)
+                    submit(depth, *expanded)
+                    print(".", end="", flush=True)
+
+        self.meta.merge({uri: fetched[uri] for uri in sorted(fetched)})
+
+    def _explore(self, uris_):
+        """explore metadata graph from uris_, and fill self.meta
+
+        with thread pool (see 'meta.workers'), coroutines (see 'sparql.concurrency'), or sequentially
+        """
+        print(f"\nlook in {len(uris_)} uri ", end="")
+        _logger.info(f"look in {len(uris_)} uri")
+        if self._workers > 1:
+            self._getSubAttrThreaded(uris_)
+        elif self._concurrency > 1:
+            util.runAsync(self._getSubAttrAsync(uris_))
+        else:
+            self._getSubAttr(uris_)
+        print(f"")
+
+        _logger.info(
+            "uri found by depth: "
+            + ", ".join(f"{depth}: {n}" for depth, n in sorted(self._depthCount.items()) if n)
+        )
 
     def _listDatasetLoaded(self):
         """ """
@@ -310,13 +870,16 @@ class SuperICPObj(object):
         for csv in setupcfg.datasetCsvPath.glob("**/*.csv"):
             output.add(csv.parent.name + ".csv")
 
-        # list URI related to those directory name(s)
-        uri_list = []
-        for chunk in util.chunks(list(output), 10):
+        # list URI related to those directory name(s),
+        # in as few queries as the SPARQL client's budget allows (to avoid too large query)
+        budget = sparqlClient.getClient().budget
+        uris = []
+        for chunk in util.chunksByBytes(sorted(output), budget):
             _ = cpmeta.DataObject()
-            uri_list.append(_.listUri(list(chunk)))
+            uris.extend(_.listUri(chunk))
 
-        return uri_list
+        # split list of URI with metadata budget, for DataObject metadata queries
+        return list(util.chunksByBytes(uris, sparqlClient.getClient().metabudget))
 
     def show(self, print_=False):
         """ """
@@ -351,84 +914,47 @@ class SuperICPObj(object):
 
     def getClassProperties(self):
         """ """
-        list_dataObj = self.meta.keys()
+        list_dataObj = list(self.meta.keys())
         # fill self.meta
-        for uri in list_dataObj:
-            print(f"\nlook in uri: {uri} ", end="")
-            _logger.info(f"look in uri: {uri}")
-            self._getSubAttr(uri)
-        print(f"")
+        self._explore(list_dataObj)
+
+        # resolve object type of every uri in one go
+        self._resolve(list(self.meta.keys()))
 
         # get properties for each class object
+        objs = []
         for uri in self.meta.keys():
             print(f"\nlook for properties in uri: {uri} ", end="")
             _logger.info(f"look for properties in uri: {uri}")
-            _ = ICPObj(uri=uri)
+            objs.append(ICPObj(uri=uri))
+
+        if self._concurrency > 1:
+            list_props = util.runAsync(self._getPropertiesAsync(objs))
+        else:
+            list_props = [_.getProperties() for _ in objs]
+
+        for _, props in zip(objs, list_props):
             objtype = _.objtype.replace(".", ":")
             if objtype not in self.classprop:
                 self.classprop[objtype] = set()
-            list_props = _.getProperties()
             # add properties if not already listed
-            self.classprop[objtype] = {*list_props, *self.classprop[objtype]}
+            self.classprop[objtype] = {*props, *self.classprop[objtype]}
 
-    def _getSubProp(self, uri_, cnt_=0):
-        """
-        dict1 = {name: value, name: value, ...}
+        self._logMemoStats()
 
-        special cases for keys 'uri' and 'NextVersionOf'.
-        - 'uri': do not iterate to avoid infinity loop
-        - 'NextVersionOf' : do not iterate to avoid recursive search inside previous versions
+    @staticmethod
+    async def _getPropertiesAsync(objs_):
+        """get properties of each object, concurrently"""
+        return await asyncio.gather(*(_.getPropertiesAsync() for _ in objs_))
+
+    def _getSubProp(self, uri_):
         """
-        cnt_ += 1
-        print("." * cnt_, end="", flush=True)
-
-        for k, lv in self.meta[uri_].items():
-            if k == "uri":
-                # do nothing, you are currently exploring it
-                _logger.debug(f"do nothing, you are currently exploring this uri -{k}-")
-            elif k in list_rec_search:
-                # Warning: linked to:
-                # - 'cpmeta:isNextVersionOf' in StaticObject, and Collection
-                # - 'cpmeta:isQualityFlagFor' in DatasetColumn
-                # - 'prov:hadPrimarySource'  in StaticObject, and Collection
-                # - 'prov:wasRevisionOf'     in StaticObject, and Collection
-                _logger.debug(
-                    f"key {k} found. do not iterate to avoid recursive search"
-                )
-            else:
-                for v in lv:
-                    if not isinstance(v, SmartWrapperValue):
-                        raise TypeError(
-                            "invalid type: element -{v}- must be of type SmartWrapperValue"
-                        )
+        explore metadata graph from uri_, and fill self.meta
 
-                    if v.type == "uri":
-                        uri = v.value
-                        if uri in self.meta:
-                            _logger.debug(f"do nothing, uri -{uri}- already in meta")
-                        else:
-                            # check object type
-                            _ = ICPObj(uri=uri)
-                            objtype = _.objtype
-
-                            try:
-                                klass = type(globals()[objtype]())
-                                _ = klass(uri=uri)
-                                try:
-                                    _.getMeta()
-                                    self.meta = {**_.meta, **self.meta}
-                                    _logger.debug(
-                                        f"dig into to explore {objtype} uri: {uri}"
-                                    )
-                                    self._getSubAttr(uri, cnt_)
-                                except Exception:
-                                    _logger.exception(
-                                        f"can not found metadata from {objtype}[{uri}]"
-                                    )
-                                    raise
-                            except Exception:
-                                _logger.exception(f"can not found class {objtype}")
-                                raise
+        same walk as _getSubAttr (worklist, no recursion): special cases for keys 'uri' and 'NextVersionOf',
+        uri already explored are skipped.
+        """
+        self._getSubAttr([uri_])
 
 
 if __name__ == "__main__":
@@ -4,8 +4,11 @@
 
 # --- import -----------------------------------
 # import from standard lib
+import asyncio
 import logging
 import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 # import from other lib
@@ -144,6 +147,242 @@ def chunks(lst, n):
         yield lst[i : i + n]
 
 
+def chunksByBytes(lst, budget_):
+    """Yield successive chunks from lst, whose size once inlined in a query do not exceed budget_ bytes
+
+    each string element is counted with its delimiters and separator (ex: '<uri> ', '"name" ').
+    a chunk holds at least one element.
+
+    >>> list(chunksByBytes(['aa', 'bbb', 'c', 'dddd'], 11))
+    [['aa', 'bbb'], ['c', 'dddd']]
+    >>> list(chunksByBytes(['aaaaaaaaaaaa', 'b'], 5))
+    [['aaaaaaaaaaaa'], ['b']]
+    """
+    chunk = []
+    size = 0
+    for x in lst:
+        n = len(str(x).encode()) + 3
+        if chunk and size + n > budget_:
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(x)
+        size += n
+    if chunk:
+        yield chunk
+
+
+# ----------------------------------------------
+def runAsync(coro_):
+    """run coroutine until complete, in a new event loop, and return its result
+
+    Note: asyncio.run is not available in python 3.6
+
+    >>> async def add(a, b):
+    ...     return a + b
+    >>> runAsync(add(1, 2))
+    3
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro_)
+    finally:
+        loop.close()
+
+
+class LRUMemo(object):
+    """
+    bounded, thread-safe, memo; least recently used entries are dropped first
+
+    >>> memo = LRUMemo(maxsize=2)
+    >>> memo.put('a', 1)
+    >>> memo.put('b', None)
+    >>> memo.get('a')
+    1
+    >>> memo.put('c', 3)
+    >>> 'b' in memo
+    False
+    >>> memo.get('b', 'missing')
+    'missing'
+    >>> memo.stats()
+    {'hits': 1, 'misses': 1, 'size': 2, 'maxsize': 2}
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """return value of key, or default if key is not memoised"""
+        with self._lock:
+            value = self._data.get(key, self._missing)
+            if value is self._missing:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """memoise value of key"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """drop every entries, and reset counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """return memo statistics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+class VisitedSet(object):
+    """
+    thread-safe set of visited items; each item is claimed once, by a single thread
+
+    >>> visited = VisitedSet(['a'])
+    >>> visited.claim(['a', 'b', 'c', 'b'])
+    ['b', 'c']
+    >>> visited.claim(['c', 'd'])
+    ['d']
+    >>> 'd' in visited, len(visited)
+    (True, 4)
+    """
+
+    def __init__(self, items_=()):
+        self._items = set(items_)
+        self._lock = threading.Lock()
+
+    def claim(self, items_):
+        """mark items as visited, and return those not visited before (in the same order)"""
+        claimed = []
+        with self._lock:
+            for item in items_:
+                if item not in self._items:
+                    self._items.add(item)
+                    claimed.append(item)
+        return claimed
+
+    def __contains__(self, item):
+        with self._lock:
+            return item in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class Accumulator(dict):
+    """
+    dictionary of lists {key: [value, ...]}, filled in place
+
+    values are appended to the list of their key, without copying the dictionary, nor its lists
+    (see combine_dict_in_list); optionally, values already in the list of their key are dropped,
+    keeping the order of their first occurrence.
+    with prepend, values are put in front of the list of their key, in the same order as
+    combine_dict_in_list(values, accumulator).
+
+    >>> acc = Accumulator({'a': 'test'})
+    >>> acc.merge({'a': ['cool', 'test'], 'b': 'main'})
+    >>> acc.add('c', 'clear')
+    >>> acc
+    {'a': ['test', 'cool', 'test'], 'b': ['main'], 'c': ['clear']}
+    >>> acc = Accumulator({'a': ['test', 'cool', 'test']}, unique=True)
+    >>> acc.add('a', 'cool')
+    >>> acc
+    {'a': ['test', 'cool']}
+    >>> acc = Accumulator({'a': 'test'}, prepend=True)
+    >>> acc.merge({'a': ['cool', 'test'], 'b': 'main'})
+    >>> acc.add('b', 'clear')
+    >>> acc == combine_dict_in_list({'b': 'clear'}, combine_dict_in_list({'a': ['cool', 'test'], 'b': 'main'}, {'a': 'test'}))
+    True
+    >>> acc
+    {'a': ['cool', 'test', 'test'], 'b': ['clear', 'main']}
+    """
+
+    def __init__(self, dict_=None, unique=False, prepend=False):
+        """initialise accumulator
+
+        :param dict_: dictionary {key: value or list of values} to merge first
+        :param unique: drop values already in the list of their key [True,False]
+        :param prepend: put values in front of the list of their key [True,False]
+        """
+        super().__init__()
+        self.unique = bool(unique)
+        self.prepend = bool(prepend)
+        # values already in the list, by key (only if unique)
+        self._seen = {}
+        if dict_:
+            self.merge(dict_)
+
+    def add(self, key_, value_):
+        """append value_ to the list of key_ (or put it in front, with prepend)"""
+        values = self.get(key_)
+        if values is None:
+            values = self[key_] = []
+            if self.unique:
+                self._seen[key_] = set()
+        if self.unique:
+            seen = self._seen[key_]
+            try:
+                if value_ in seen:
+                    return
+                seen.add(value_)
+            except TypeError:
+                # unhashable value
+                if value_ in values:
+                    return
+        if self.prepend:
+            values.insert(0, value_)
+        else:
+            values.append(value_)
+
+    def merge(self, dict_):
+        """append values of dict_ {key: value or list of values} to the list of their key
+
+        with prepend, values of each key are put, as a block, in front of the list of their key
+        """
+        for key, value in dict_.items():
+            if not isinstance(value, list):
+                self.add(key, value)
+            elif self.unique:
+                for _ in value if not self.prepend else reversed(value):
+                    self.add(key, _)
+            elif key not in self:
+                self[key] = list(value)
+            elif self.prepend:
+                self[key][:0] = value
+            else:
+                self[key].extend(value)
+
+    def __delitem__(self, key_):
+        super().__delitem__(key_)
+        self._seen.pop(key_, None)
+
+
 # Press the green button in the gutter to run the script.
 if __name__ == "__main__":
 